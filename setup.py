@@ -3,7 +3,10 @@ from setuptools import setup, find_packages
 setup(
     name="BootstrapSeq",
     version="0.1.0",
-    packages=find_packages(),
+    packages=find_packages("workflow/scripts"),
+    package_dir={"": "workflow/scripts"},
+    package_data={"bootstrapseq": ["R_functions.r"]},
+    entry_points={"console_scripts": ["bootstrapseq=bootstrapseq.main:main"]},
     install_requires=["jupyter", "pandas", "seaborn"],
     extras_require={"bio": ["edgeR", "DESeq2"]},
     author="Peter Degen",
@@ -0,0 +1,41 @@
+#' Reference normalization factors for tests/test_normalization.py
+#'
+#' Computes edgeR TMM factors (calcNormFactors, method = "TMM") and DESeq2 median-of-ratios size factors
+#' (estimateSizeFactorsForMatrix) for resources/BSLA.N5.csv and a few fixed resamples with duplicated columns, and
+#' writes them to tests/data/BSLA.N5.normalization_factors.csv. Run from the repository root:
+#'
+#'     Rscript tests/data/normalization_factors.r
+
+suppressPackageStartupMessages(require("edgeR"))
+suppressPackageStartupMessages(require("DESeq2"))
+
+x <- as.matrix(read.csv("resources/BSLA.N5.csv", row.names = 1, check.names = FALSE))
+
+# Column indices (1-based) of the full data and of resamples with duplicates
+resamples <- list(
+  seq_len(ncol(x)),
+  c(1, 1, 2, 4, 5, 6, 6, 8, 9, 10),
+  c(2, 3, 3, 3, 5, 7, 8, 8, 9, 10),
+  c(1, 2, 2, 2, 4, 6, 7, 7, 7, 9),
+  c(5, 5, 5, 5, 5, 10, 10, 10, 10, 10)
+)
+
+tables <- lapply(seq_along(resamples), function(r) {
+  idx <- resamples[[r]]
+  counts <- x[, idx]
+  colnames(counts) <- paste0(colnames(counts), seq_along(idx))
+  data.frame(
+    resample = r - 1,
+    position = seq_along(idx) - 1,
+    column = idx - 1, # 0-based, as in numpy
+    norm_factor = calcNormFactors(DGEList(counts = counts), method = "TMM")$samples$norm.factors,
+    size_factor = unname(estimateSizeFactorsForMatrix(counts))
+  )
+})
+
+out <- do.call(rbind, tables)
+write.csv(out, "tests/data/BSLA.N5.normalization_factors.csv", row.names = FALSE)
+writeLines(paste0(
+  "R ", R.version$major, ".", R.version$minor,
+  "; edgeR ", packageVersion("edgeR"), "; DESeq2 ", packageVersion("DESeq2")
+))
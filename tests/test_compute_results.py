@@ -0,0 +1,62 @@
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bootstrapseq.compute_results import process_results
+from bootstrapseq.metrics import compute_metrics
+from bootstrapseq.metrics import read_merged_trials
+
+
+def results_table(rng: np.random.Generator, genes: pd.Index, min_fdr: float = 0) -> pd.DataFrame:
+    fdr = rng.uniform(min_fdr, 1, size=len(genes))
+    return pd.DataFrame({"logFC": rng.normal(size=len(genes)), "FDR": fdr}, index=genes)
+
+
+@pytest.fixture
+def results_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    genes = pd.Index([f"g{i}" for i in range(40)])
+    results_table(rng, genes, min_fdr=0.1).to_csv(tmp_path / "test_original.csv")  # no reference DEGs
+    trials = []
+    for trial in range(1, 12):
+        # Trials may miss genes, e.g. after filtering, so pieces do not align with trial boundaries
+        tab = results_table(rng, genes[: 30 + trial])
+        tab["Trial"] = trial
+        trials.append(tab)
+    pd.concat(trials).to_csv(tmp_path / "test_trials_merged_11.csv")
+    return tmp_path
+
+
+@pytest.mark.parametrize("rows", [1, 25, 100, 10_000])
+def test_read_merged_trials_yields_complete_trials(results_dir, rows):
+    path = results_dir / "test_trials_merged_11.csv"
+    pieces = list(read_merged_trials(path, rows))
+    trials = [trial for piece in pieces for trial in piece["Trial"].unique()]
+    assert trials == list(range(1, 12))
+    pd.testing.assert_frame_equal(pd.concat(pieces), pd.read_csv(path, index_col=0))
+
+
+def test_chunked_metrics_match_full_table(results_dir):
+    reference = pd.read_csv(results_dir / "test_original.csv", index_col=0)
+    path = results_dir / "test_trials_merged_11.csv"
+    full = compute_metrics(reference, pd.read_csv(path, index_col=0))
+    chunked = compute_metrics(reference, read_merged_trials(path, rows=50), chunk_size=2)
+    pd.testing.assert_frame_equal(chunked, full)
+
+
+def test_stats_without_reference_degs_are_valid_json(results_dir):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        process_results(str(results_dir), "test", 11, make_figs=False, chunk_size=3)
+
+    with open(results_dir / "test_stats.json") as f:
+        stats = json.load(f, parse_constant=lambda constant: pytest.fail(f"Invalid JSON constant {constant}"))
+    assert len(stats["spearmans"]) == 11
+    assert stats["spearman_median"] == pytest.approx(np.median(stats["spearmans"]))
+    # Without reference DEGs the top-k overlap is undefined for every trial
+    assert stats["topks"] == []
+    assert stats["topk_median"] is None
+    assert stats["topk_std"] is None
@@ -0,0 +1,37 @@
+import pytest
+
+from bootstrapseq import main as cli
+
+
+@pytest.fixture
+def called(monkeypatch):
+    """Replace the subcommands that run trials, recording the parsed arguments"""
+    calls = []
+    for command in ["cmd_run_trial", "cmd_jackknife"]:
+        monkeypatch.setattr(cli, command, calls.append)
+    return calls
+
+
+def test_jackknife_accepts_deseq2(called):
+    cli.main(["jackknife", "out", "test", "counts.csv", "paired", "--method", "deseq2"])
+    assert called[0].method == "deseq2"
+    assert cli.trial_options(called[0])["bootstrap"] == "resample"
+
+
+def test_jackknife_has_no_bootstrap_option(called):
+    with pytest.raises(SystemExit):
+        cli.main(["jackknife", "out", "test", "counts.csv", "paired", "--bootstrap", "multinomial"])
+
+
+@pytest.mark.parametrize(
+    "options", [["--method", "deseq2", "--bootstrap", "multinomial"], ["--method", "edger", "--shards", "2"]]
+)
+def test_run_trial_rejects_unsupported_options(called, options):
+    with pytest.raises(SystemExit):
+        cli.main(["run-trial", "out", "test", "1", "counts.csv", "paired", *options])
+    assert called == []
+
+
+def test_run_trial_accepts_parallel_deseq2(called):
+    cli.main(["run-trial", "out", "test", "1", "counts.csv", "paired", "--method", "deseq2", "--shards", "4"])
+    assert cli.trial_options(called[0])["n_shards"] == 4
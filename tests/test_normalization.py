@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bootstrapseq.normalization import size_factors
+from bootstrapseq.normalization import tmm_factors
+
+
+ROOT = Path(__file__).parents[1]
+COUNTS = ROOT / "resources" / "BSLA.N5.csv"
+# Generated by tests/data/normalization_factors.r with edgeR and DESeq2
+REFERENCE = ROOT / "tests" / "data" / "BSLA.N5.normalization_factors.csv"
+
+RESAMPLES = np.array(
+    [
+        [0, 0, 1, 3, 4, 5, 5, 7, 8, 9],
+        [1, 2, 2, 2, 4, 6, 7, 7, 8, 9],
+        [0, 1, 1, 1, 3, 5, 6, 6, 6, 8],
+        [4, 4, 4, 4, 4, 9, 9, 9, 9, 9],
+    ]
+)
+
+
+@pytest.fixture(scope="module")
+def counts() -> np.ndarray:
+    return pd.read_csv(COUNTS, index_col=0).to_numpy()
+
+
+@pytest.fixture(scope="module")
+def reference() -> pd.DataFrame:
+    if not REFERENCE.exists():
+        pytest.skip(f"Run Rscript tests/data/normalization_factors.r to create {REFERENCE.name}")
+    return pd.read_csv(REFERENCE)
+
+
+@pytest.mark.parametrize(("function", "column"), [(tmm_factors, "norm_factor"), (size_factors, "size_factor")])
+def test_factors_match_r(counts, reference, function, column):
+    resamples = [group.sort_values("position") for _, group in reference.groupby("resample")]
+    indices = np.array([group["column"].to_numpy() for group in resamples])
+    expected = np.array([group[column].to_numpy() for group in resamples])
+
+    # Each resample on its own and all resamples in one batch
+    for ind, exp in zip(indices, expected, strict=True):
+        np.testing.assert_allclose(function(counts[:, ind]), exp, rtol=1e-10)
+        np.testing.assert_allclose(function(counts, indices=ind), exp, rtol=1e-10)
+    np.testing.assert_allclose(function(counts, indices=indices), expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize("function", [tmm_factors, size_factors])
+def test_batched_indices_match_duplicated_columns(counts, function):
+    batched = function(counts, indices=RESAMPLES)
+    for ind, factors in zip(RESAMPLES, batched, strict=True):
+        np.testing.assert_allclose(factors, function(counts[:, ind]), rtol=1e-12)
+
+
+@pytest.mark.parametrize("function", [tmm_factors, size_factors])
+def test_integer_weights_match_indices(counts, function):
+    weights = np.array([np.bincount(ind, minlength=counts.shape[1]) for ind in RESAMPLES])
+    by_weight = function(counts, weights=weights)
+    by_index = function(counts, indices=RESAMPLES)
+    # Factors are per sample for weights and per drawn column for indices; duplicates of a sample share its factor
+    for ind, weighted, indexed in zip(RESAMPLES, by_weight, by_index, strict=True):
+        np.testing.assert_allclose(weighted[ind], indexed, rtol=1e-12)
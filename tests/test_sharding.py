@@ -0,0 +1,54 @@
+"""Sharded and parallel fits must reproduce the serial DEA tables. Requires rpy2 with R, edgeR and DESeq2."""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+
+try:
+    import rpy2.robjects as ro
+except Exception:  # rpy2 missing, or installed without a working R
+    pytest.skip("rpy2 with a working R installation is required", allow_module_level=True)
+
+from bootstrapseq.benchmark import compare_tables
+from bootstrapseq.DEA import run_dea
+
+
+RESOURCES = Path(__file__).parents[1] / "resources"
+COUNTS = RESOURCES / "BSLA.N5.csv"
+DESIGN = str(RESOURCES / "BSLA.N5.meta.csv")
+
+
+def require_r_package(package: str) -> None:
+    if not ro.r(f'requireNamespace("{package}", quietly = TRUE)')[0]:
+        pytest.skip(f"R package {package} is not installed")
+
+
+def fit(tmp_path: Path, method: str, n_shards: int, **kwargs) -> pd.DataFrame:
+    outfile = tmp_path / f"{method}_{n_shards}.csv"
+    df = pd.read_csv(COUNTS, index_col=0)
+    run_dea(df, str(outfile), method, True, design=DESIGN, n_shards=n_shards, **kwargs)
+    return pd.read_csv(outfile, index_col=0)
+
+
+@pytest.mark.parametrize("n_shards", [2, 4])
+def test_edger_lrt_shards_match_serial_fit(tmp_path, n_shards):
+    require_r_package("edgeR")
+    serial = fit(tmp_path, "edger", 1, test="lrt")
+    sharded = fit(tmp_path, "edger", n_shards, test="lrt")
+    compare_tables(sharded, serial)
+
+
+def test_edger_ql_rejects_shards(tmp_path):
+    require_r_package("edgeR")
+    with pytest.raises(Exception, match="only supported for the edgeR LRT"):
+        fit(tmp_path, "edger", 2)
+
+
+@pytest.mark.parametrize("n_shards", [2, 4])
+def test_deseq2_parallel_matches_serial_fit(tmp_path, n_shards):
+    require_r_package("DESeq2")
+    serial = fit(tmp_path, "deseq2", 1)
+    parallel = fit(tmp_path, "deseq2", n_shards)
+    compare_tables(parallel, serial)
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from bootstrapseq import trial_cache
+
+
+@pytest.fixture
+def counts(tmp_path):
+    path = tmp_path / "counts.csv"
+    pd.DataFrame({"a": [1, 2], "b": [3, 4]}, index=["g1", "g2"]).to_csv(path)
+    return str(path)
+
+
+def test_key_depends_on_fitting_code(counts, monkeypatch):
+    key = trial_cache.trial_key(counts, "paired", "edger", 0, 1)
+    assert trial_cache.trial_key(counts, "paired", "edger", 0, 1) == key
+
+    monkeypatch.setattr(trial_cache, "code_digest", lambda: "changed")
+    assert trial_cache.trial_key(counts, "paired", "edger", 0, 1) != key
+
+
+def test_code_digest_covers_installed_files():
+    assert len(trial_cache.code_digest()) == 64
+    assert "R_functions.r" in trial_cache.CODE_FILES
+
+
+def test_put_get_and_evict(counts, tmp_path):
+    cache_dir = tmp_path / "cache"
+    key = trial_cache.trial_key(counts, "paired", "edger", 0, 1)
+    outfile = tmp_path / "trial_1.csv"
+    assert not trial_cache.get(cache_dir, key, outfile)
+
+    trial_cache.put(cache_dir, key, counts)
+    assert trial_cache.get(cache_dir, key, outfile)
+    assert outfile.read_bytes() == open(counts, "rb").read()
+
+    trial_cache.put(cache_dir, key, counts, max_bytes=0)
+    assert not trial_cache.get(cache_dir, key, outfile)
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+from pathlib import Path
+
+import pytest
+
+from bootstrapseq import work_queue
+
+
+def record_trial(outdir: Path, trial: int) -> None:
+    # One file per execution, so duplicates from different workers do not overwrite each other
+    (outdir / f"{trial}.{os.getpid()}").touch()
+
+
+def worker(queue_dir: Path, outdir: Path, trials: int, barrier) -> None:
+    barrier.wait()  # all workers race to create the queue at once
+    work_queue.init_queue(queue_dir, trials, block_size=3)
+    work_queue.run_worker(queue_dir, lambda trial: record_trial(outdir, trial))
+
+
+def drain(queue_dir: Path) -> list[int]:
+    trials: list[int] = []
+    work_queue.run_worker(queue_dir, trials.append, worker_id="w")
+    return trials
+
+
+@pytest.mark.parametrize("n_workers", [2, 8])
+def test_concurrent_workers_run_each_trial_exactly_once(tmp_path, n_workers):
+    queue_dir, outdir = tmp_path / "queue", tmp_path / "out"
+    outdir.mkdir()
+    trials = 50
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    processes = [ctx.Process(target=worker, args=(queue_dir, outdir, trials, barrier)) for _ in range(n_workers)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=120)
+        assert p.exitcode == 0
+
+    executed = sorted(int(f.split(".")[0]) for f in os.listdir(outdir))
+    assert executed == list(range(trials + 1))
+    assert work_queue.completed_trials(queue_dir) == list(range(trials + 1))
+    assert work_queue.queue_status(queue_dir) == {"pending": 0, "claimed": 0, "done": 17, "expired": 0}
+
+
+def test_expired_lease_is_stolen(tmp_path):
+    work_queue.init_queue(tmp_path, 3, block_size=4, first_trial=1)
+    stale = work_queue.claim_block(tmp_path, "a", lease_seconds=-1)
+    assert work_queue.queue_status(tmp_path)["expired"] == 1
+
+    stolen = work_queue.claim_block(tmp_path, "b", lease_seconds=60)
+    assert stolen.name.split("@")[:2] == ["000001-000003", "b"]
+    assert work_queue.claim_block(tmp_path, "c", lease_seconds=60) is None  # the new lease is not expired
+
+    # The original worker notices the lost lease when it next renews
+    with pytest.raises(FileNotFoundError):
+        work_queue.renew_lease(stale, 60)
+    work_queue.complete_block(tmp_path, stolen)
+    assert work_queue.completed_trials(tmp_path) == [1, 2, 3]
+
+
+def test_worker_moves_on_after_losing_lease(tmp_path):
+    work_queue.init_queue(tmp_path, 2, block_size=3, first_trial=1)
+    ran: list[int] = []
+
+    def run_and_lose_lease(trial: int) -> None:
+        ran.append(trial)
+        if trial == 1:
+            work_queue.claim_block(tmp_path, "thief", lease_seconds=60)  # steals the expired lease
+
+    assert work_queue.run_worker(tmp_path, run_and_lose_lease, worker_id="slow", lease_seconds=-1) == 0
+    assert ran == [1]
+    assert work_queue.completed_trials(tmp_path) == []
+
+
+def test_late_init_does_not_refill_drained_queue(tmp_path):
+    assert work_queue.init_queue(tmp_path, 10, block_size=4) == 3
+    assert drain(tmp_path) == list(range(11))
+
+    # A worker started after the queue was drained calls init_queue with the same arguments
+    assert work_queue.init_queue(tmp_path, 10, block_size=4) == 0
+    assert drain(tmp_path) == []
+    assert work_queue.queue_status(tmp_path) == {"pending": 0, "claimed": 0, "done": 3, "expired": 0}
+
+
+def test_repeated_extension_adds_blocks_once(tmp_path):
+    assert work_queue.init_queue(tmp_path, 4, block_size=2, first_trial=1) == 2
+    assert drain(tmp_path) == [1, 2, 3, 4]
+
+    assert work_queue.init_queue(tmp_path, 8, block_size=2, first_trial=1) == 2
+    assert work_queue.init_queue(tmp_path, 8, block_size=2, first_trial=1) == 0
+    assert drain(tmp_path) == [5, 6, 7, 8]
+    assert work_queue.init_queue(tmp_path, 8, block_size=2, first_trial=1) == 0  # again after draining
+    assert work_queue.init_queue(tmp_path, 6, block_size=2, first_trial=1) == 0  # fewer trials than queued
+
+    assert work_queue.init_queue(tmp_path, 9, block_size=2, first_trial=1) == 1
+    assert drain(tmp_path) == [9]
+    assert work_queue.completed_trials(tmp_path) == list(range(1, 10))
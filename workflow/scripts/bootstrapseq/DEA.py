@@ -0,0 +1,81 @@
+import logging
+from functools import lru_cache
+from importlib.resources import as_file
+from importlib.resources import files
+
+import pandas as pd
+import rpy2.robjects as ro
+from rpy2.rinterface_lib.callbacks import logger as rpy2_logger
+
+from .normalization import size_factors
+from .R_wrappers import pd_to_r
+
+
+@lru_cache(maxsize=None)
+def dea_versions(method: str) -> str:
+    """R and package versions used by run_dea for method, e.g. "R 4.3.3; edgeR 4.0.16" """
+    package = "DESeq2" if method.lower() == "deseq2" else "edgeR"
+    r_version = ro.r("paste(R.version$major, R.version$minor, sep = '.')")[0]
+    package_version = ro.r(f'as.character(packageVersion("{package}"))')[0]
+    return f"R {r_version}; {package} {package_version}"
+
+
+def run_dea(
+    df: pd.DataFrame,
+    outfile: str,
+    method: str,
+    overwrite: bool = False,
+    design: str | pd.DataFrame = "paired",
+    lfc: float = 0,
+    verbose: bool = False,
+    **kwargs,
+) -> None:
+    """Wrapper to call appropriate R method to run differential expression analysis
+
+    Parameters
+    ----------
+    df : pd.DataFrame, count data with m rows, n columns
+    method: str, "edgerqlf", "edgerlrt" or "deseq2"
+    overwrite: bool, overwrite existing results table if it already exists
+    design: str or pd.DataFrame, "paired", "unpaired", path to a csv file with covariates, or the covariate table
+        itself (index matching df columns), which is passed to R without a round-trip through a file
+    lfc: float, formal log2 fold change threshold when testing for differential expression
+    kwargs: additional keyword arguments passed to R method, e.g. sample_weights for a weighted bootstrap, or
+        precomputed norm_factors (edgeR) / size_factors (DESeq2)
+    """
+
+    # R_functions.r is package data, found next to this module in a checkout and in any kind of install
+    with as_file(files(__package__).joinpath("R_functions.r")) as r_script_path:
+        ro.r["source"](str(r_script_path))  # Loading the R script
+
+    # Converting pd to R dataframe
+    df_r = df if isinstance(df, ro.vectors.DataFrame) else pd_to_r(df)
+
+    if not verbose:
+        rpy2_logger.setLevel(logging.ERROR)
+
+    if isinstance(design, pd.DataFrame):
+        design = pd_to_r(design)
+
+    for key in ["sample_weights", "norm_factors", "size_factors"]:
+        if kwargs.get(key) is not None:
+            kwargs[key] = ro.FloatVector(kwargs[key])
+
+    if method.lower() in ["edgerqlf", "edgerlrt", "edger"]:
+        logging.info(f"\nCalling edgeR in R with kwargs:\n{kwargs}\n")
+        edger = ro.globalenv["run_edgeR"]  # Finding the R function in the script
+        edger(df_r, str(outfile), design, overwrite, lfc=lfc, **kwargs)
+
+    elif method.lower() == "deseq2":
+        logging.info(f"\nCalling DESeq2 in R with kwargs:\n{kwargs}\n")
+        if isinstance(df, ro.vectors.DataFrame):
+            raise Exception("Not yet implemented for DESeq2: calling directly with df_r")
+        deseq2 = ro.globalenv["run_deseq2"]
+        deseq2(df_r, str(outfile), design, overwrite=overwrite, lfc=lfc, **kwargs)
+    else:
+        raise Exception(f"Method {method} not implemented")
+
+
+def normalize_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize a count matrix with DESeq2 median-of-ratios size factors, computed in NumPy"""
+    return df.div(size_factors(df.to_numpy()), axis=1)
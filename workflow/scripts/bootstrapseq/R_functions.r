@@ -40,6 +40,84 @@ edgeR_filterByExpression <- function(inpath, outpath, design) {
   write.csv(y$counts, outpath, row.names = TRUE)
 }
 
+#' Build the design formula ~ covariates + Condition from a covariate table
+#'
+#' @param covariates: data frame with a "Condition" column and sample names as row names, or path to a csv file
+#'   whose "X" or "Sample" column holds the sample names
+#' @param relevel_condition: logical, use the condition of the first sample as the reference level
+#' @return list with the formula and the covariate data frame (character columns converted to factors)
+covariate_design <- function(covariates, relevel_condition = FALSE) {
+  if (is.data.frame(covariates)) {
+    covariate_df <- covariates
+  } else {
+    print("Constructing design matrix from csv")
+    covariate_df <- read.csv(covariates)
+    if ("X" %in% names(covariate_df)) {
+      rownames(covariate_df) <- covariate_df$X
+    } else if ("Sample" %in% names(covariate_df)) {
+      rownames(covariate_df) <- covariate_df$Sample
+    } else {
+      stop("Sample names not found in covariate df")
+    }
+  }
+
+  if (!("Condition" %in% colnames(covariate_df))) {
+    stop("Error: 'Condition' column not found in dataframe")
+  }
+
+  # Base R instead of dplyr::mutate_if keeps the row names
+  covariate_df[] <- lapply(covariate_df, function(v) if (is.character(v)) as.factor(v) else v)
+
+  if (relevel_condition) {
+    # Relevel 'Condition' so that its first level is used as the reference
+    first_condition <- as.character(covariate_df$Condition[1])
+    print(paste("Reference condition:", first_condition))
+    covariate_df$Condition <- relevel(covariate_df$Condition, ref = first_condition)
+  }
+
+  other_vars <- setdiff(names(covariate_df), c("Condition", "X", "Sample"))
+  formula <- as.formula(paste("~", paste(c(other_vars, "Condition"), collapse = " + ")))
+  print(paste("Formula:", formula))
+  list(formula = formula, data = covariate_df)
+}
+
+#' Fit the edgeR GLM in parallel gene shards and reassemble a single DGEGLM
+#'
+#' Dispersions are estimated beforehand on all genes, so the per-gene glmFit fits are independent and the reassembled
+#' object is identical to an unsharded glmFit. The QL fit is not sharded: glmQLFit shares information across genes
+#' (the quasi-dispersion prior, and in edgeR 4 also the unit deviance adjustment), so shards would change the results.
+#'
+#' @param y: DGEList with estimated dispersions
+#' @param design: design matrix
+#' @param n_shards: int, number of gene shards (and worker processes)
+glm_fit_sharded <- function(y, design, n_shards) {
+  n_shards <- min(as.integer(n_shards), nrow(y))
+  shards <- split(seq_len(nrow(y)), sort(rep_len(seq_len(n_shards), nrow(y))))
+
+  fits <- parallel::mclapply(shards, function(idx) glmFit(y[idx, ], design), mc.cores = n_shards)
+  failed <- vapply(fits, inherits, logical(1), what = "try-error")
+  if (any(failed)) {
+    stop(paste("Shard fit failed:", fits[failed][[1]]))
+  }
+
+  # Concatenate per-gene fields, keep per-sample and scalar fields from the first shard
+  per_gene_vectors <- c("deviance", "iter", "failed", "df.residual", "dispersion", "AveLogCPM")
+  per_gene_matrices <- c("coefficients", "unshrunk.coefficients", "fitted.values", "counts", "offset", "weights")
+  fit <- fits[[1]]
+  for (field in c(per_gene_vectors, per_gene_matrices, "genes")) {
+    values <- unname(lapply(fits, `[[`, field))
+    if (is.null(values[[1]])) next
+    if (field %in% per_gene_vectors) {
+      fit[[field]] <- unlist(values)
+    } else if (field == "genes") {
+      fit[[field]] <- do.call(rbind, values)
+    } else {
+      fit[[field]] <- do.call(rbind, lapply(values, as.matrix)) # offsets may be a CompressedMatrix
+    }
+  }
+  fit
+}
+
 #' Run edgeR
 #'
 #' @param x: dataframe of counts
@@ -49,8 +127,12 @@ edgeR_filterByExpression <- function(inpath, outpath, design) {
 #' @param top_tags: int or "Inf", store the results of the most significant genes only
 #' @param lfc: float, logFC threshold when testing for DE
 #' @param cols_to_keep: list of output table columns to save
+#' @param n_shards: int, split genes into this many shards and fit them in parallel after dispersion estimation (LRT only)
+#' @param sample_weights: numeric vector of per-sample bootstrap multiplicities used as GLM prior weights, or NULL
+#' @param norm_factors: numeric vector of precomputed TMM factors used instead of calcNormFactors, or NULL
 run_edgeR <- function(x, outfile, design, overwrite = FALSE, filter_expr = FALSE, top_tags = "Inf", verbose = FALSE,
-                      lfc = 0, cols_to_keep = "all", test = "qlf", meta_only = FALSE, check_gof = FALSE, N_control = 0, N_treat = 0) {
+                      lfc = 0, cols_to_keep = "all", test = "qlf", meta_only = FALSE, check_gof = FALSE, N_control = 0, N_treat = 0,
+                      n_shards = 1, sample_weights = NULL, norm_factors = NULL) {
   suppressPackageStartupMessages(require("edgeR"))
   suppressPackageStartupMessages(require("limma"))
 
@@ -60,7 +142,10 @@ run_edgeR <- function(x, outfile, design, overwrite = FALSE, filter_expr = FALSE
     return()
   }
 
-  if (design == "paired") {
+  if (is.data.frame(design) || grepl("\\.csv$", design, ignore.case = TRUE)) {
+    covariates <- covariate_design(design, relevel_condition = TRUE)
+    design <- model.matrix(covariates$formula, data = covariates$data)
+  } else if (design == "paired") {
     if (ncol(x) %% 2 != 0) {
       stop("Paired-design matrix must have even number of columns")
     }
@@ -84,35 +169,8 @@ run_edgeR <- function(x, outfile, design, overwrite = FALSE, filter_expr = FALSE
     }
     condition <- factor(c(rep("N", N_control), rep("T", N_treat)))
     design <- model.matrix(~condition)
-  } else if (grepl("\\.csv$", design, ignore.case = TRUE)) {
-    print("Constructing design matrix from df")
-    covariate_df <- read.csv(design)
-    if (!("Condition" %in% colnames(covariate_df))) {
-      stop("Error: 'Condition' column not found in dataframe")
-    }
-
-    covariate_df <- covariate_df %>%
-      mutate_if(is.character, as.factor)
-
-    # Relevel 'Condition' so that its first level is used as the reference
-    first_condition <- as.character(covariate_df$Condition[1])
-    print(paste("Reference condition:", first_condition))
-    covariate_df$Condition <- relevel(covariate_df$Condition, ref=first_condition)
-
-    other_vars <- setdiff(names(covariate_df), c("Condition", "X", "Sample"))
-    #print("Warning: hard-coded col names in design matrix")
-    formula <- as.formula(paste("~", paste(c(other_vars, "Condition"), collapse = " + ")))
-    print(paste("Formula:", formula))
-    design <- model.matrix(formula, data = covariate_df)
-
-    # Ensure your count matrix and metadata align
-    if ("X" %in% names(covariate_df)) {
-      rownames(covariate_df) <- covariate_df$X
-    } else if ("Sample" %in% names(covariate_df)) {
-      rownames(covariate_df) <- covariate_df$Sample
-    } else {
-      stop("Sample names not found in covariate df")
-    }
+  } else {
+    stop(paste("Invalid design:", design))
   }
 
   if (verbose) {
@@ -122,6 +180,10 @@ run_edgeR <- function(x, outfile, design, overwrite = FALSE, filter_expr = FALSE
   }
 
   y <- DGEList(counts = x)
+  if (!is.null(sample_weights)) {
+    # Weights are stored per observation, so they follow the DGEList through filtering and sharding
+    y$weights <- matrix(sample_weights, nrow = nrow(y), ncol = ncol(y), byrow = TRUE)
+  }
 
   print(length(rownames(design)))
   print(length(colnames(y)))
@@ -132,14 +194,23 @@ run_edgeR <- function(x, outfile, design, overwrite = FALSE, filter_expr = FALSE
     y <- y[keep, , keep.lib.sizes = FALSE]
   }
 
-  y <- calcNormFactors(y)
+  if (is.null(norm_factors)) {
+    y <- calcNormFactors(y)
+  } else {
+    y$samples$norm.factors <- norm_factors
+  }
   y <- estimateDisp(y, design, robust = TRUE)
 
   if (meta_only) {
     return(y)
   }
 
-  if (test == "lrt") {
+  if (n_shards > 1) {
+    if (test != "lrt") {
+      stop("Gene sharding is only supported for the edgeR LRT, use n_shards = 1 for the QL test")
+    }
+    fit <- glm_fit_sharded(y, design, n_shards)
+  } else if (test == "lrt") {
     fit <- glmFit(y, design)
   } else {
     fit <- glmQLFit(y, design)
@@ -176,7 +247,8 @@ run_edgeR <- function(x, outfile, design, overwrite = FALSE, filter_expr = FALSE
 # DESeq2
 run_deseq2 <- function(
     x, outfile, design = "paired", overwrite = FALSE, print_summary = FALSE, cols_to_keep = "all",
-    size_factors_only = FALSE, lfc = 0, shrink_lfc = FALSE, shrink_method = "apeglm") {
+    size_factors_only = FALSE, lfc = 0, shrink_lfc = FALSE, shrink_method = "apeglm", sample_weights = NULL,
+    size_factors = NULL, N_control = 0, N_treat = 0, n_shards = 1) {
   if (!overwrite && file.exists(outfile)) {
     print("Existing table not overwritten")
     return()
@@ -184,7 +256,13 @@ run_deseq2 <- function(
 
   suppressPackageStartupMessages(require("DESeq2"))
 
-  if (design == "paired") {
+  if (is.data.frame(design)) {
+    design_type <- "custom"
+  } else {
+    design_type <- design
+  }
+
+  if (design_type == "paired") {
     if (ncol(x) %% 2 != 0) {
       stop("Paired-design matrix must have even number of columns")
     }
@@ -200,7 +278,7 @@ run_deseq2 <- function(
       colData = coldata,
       design = ~ patient + Condition
     )
-  } else if (design == "unpaired") {
+  } else if (design_type == "unpaired") {
     if (ncol(x) %% 2 != 0) {
       stop("Design matrix must have even number of columns")
     }
@@ -214,30 +292,26 @@ run_deseq2 <- function(
       colData = coldata,
       design = ~Condition
     )
-  } else {
-    print("Constructing design matrix from df")
-    covariate_df <- read.csv(design)
-    if (!("Condition" %in% colnames(covariate_df))) {
-      stop("Error: 'Condition' column not found in dataframe")
+  } else if (design_type == "unpaired_asymmetric") {
+    if (N_control == 0) {
+      stop("Design matrix has no control columns")
     }
-
-    covariate_df <- covariate_df %>%
-      mutate_if(is.character, as.factor)
-
-    other_vars <- setdiff(names(covariate_df), c("Condition", "X", "Sample"))
-    print("Warning: hard-coded col names in design matrix")
-    formula <- as.formula(paste("~", paste(c(other_vars, "Condition"), collapse = " + ")))
-    print(paste("Formula:", formula))
-    design <- model.matrix(formula, data = covariate_df)
-
-    # Ensure your count matrix and metadata align
-    if ("X" %in% names(covariate_df)) {
-      rownames(covariate_df) <- covariate_df$X
-    } else if ("Sample" %in% names(covariate_df)) {
-      rownames(covariate_df) <- covariate_df$Sample
-    } else {
-      stop("Sample names not found in covariate df")
+    if (N_treat == 0) {
+      stop("Design matrix has no treatment/condition columns")
     }
+    coldata <- data.frame(
+      Condition = factor(c(rep("N", N_control), rep("T", N_treat))),
+      row.names = colnames(x)
+    )
+    dds <- DESeqDataSetFromMatrix(
+      countData = x,
+      colData = coldata,
+      design = ~Condition
+    )
+  } else {
+    covariates <- covariate_design(design)
+    covariate_df <- covariates$data
+    formula <- covariates$formula
 
     x <- x[, rownames(covariate_df)] # Align count data with metadata
     # Create DESeqDataSet object
@@ -254,9 +328,27 @@ run_deseq2 <- function(
     return(sizeFactors(estimateSizeFactors(dds)))
   }
 
-  dds <- DESeq(dds)
+  if (!is.null(size_factors)) {
+    sizeFactors(dds) <- size_factors # precomputed, DESeq() then skips estimateSizeFactors
+  }
+
+  # Observation weights, e.g. for downweighting outliers. DESeq2 rescales them by the maximum weight per gene and
+  # treats small relative weights as removed samples, so they are not bootstrap multiplicities: run_trial only
+  # allows weighted bootstrap schemes with edgeR.
+  if (!is.null(sample_weights)) {
+    assays(dds)[["weights"]] <- matrix(sample_weights, nrow = nrow(dds), ncol = ncol(dds), byrow = TRUE)
+  }
+
+  # With n_shards > 1, DESeq() splits the genes into one chunk per forked worker (BiocParallel multicore backend)
+  parallel <- n_shards > 1
+  bpparam <- if (parallel) BiocParallel::MulticoreParam(workers = as.integer(n_shards)) else BiocParallel::SerialParam()
+  dds <- DESeq(dds, parallel = parallel, BPPARAM = bpparam, quiet = TRUE)
   contrastname <- resultsNames(dds)[grepl("Condition", resultsNames(dds))]
-  res <- results(dds, name = contrastname, lfcThreshold = lfc, altHypothesis = "greaterAbs", test = "Wald")
+  res <- results(
+    dds,
+    name = contrastname, lfcThreshold = lfc, altHypothesis = "greaterAbs", test = "Wald",
+    parallel = parallel, BPPARAM = bpparam
+  )
 
   if (shrink_lfc) {
     print("shrinking lfc")
@@ -0,0 +1 @@
+"""Bootstrap resampling of RNA-Seq data sets to estimate the reliability of differential expression results."""
@@ -0,0 +1,104 @@
+"""Wall time of a single DEA fit of the full count matrix: edgeR, serial DESeq2 and parallel DESeq2.
+
+Each configuration is fitted once untimed, so that loading the R packages is not attributed to the first
+configuration of a method, and then timed over several repeats. Parallel fits are checked against the serial fit of
+the same method on the full output table (logFC, PValue, FDR), since splitting the genes across workers should not
+change the results.
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .DEA import dea_versions
+from .DEA import run_dea
+
+
+# edgeR reports PValue, DESeq2 pvalue (see run_deseq2)
+COMPARED_COLUMNS = ["logFC", "PValue", "pvalue", "FDR"]
+
+
+def compare_tables(table: pd.DataFrame, reference: pd.DataFrame, rtol: float = 1e-6, atol: float = 1e-12) -> float:
+    """Maximum absolute difference of the compared columns. Raises if genes or values do not match within tolerance."""
+    if not table.index.sort_values().equals(reference.index.sort_values()):
+        raise Exception("Tables have different genes")
+    table = table.loc[reference.index]
+    columns = [col for col in COMPARED_COLUMNS if col in reference.columns]
+    if len(columns) < 3:
+        raise Exception(f"Expected logFC, p-value and FDR columns, found: {list(reference.columns)}")
+
+    max_diff = 0.0
+    for col in columns:
+        a = table[col].to_numpy(dtype=float)
+        b = reference[col].to_numpy(dtype=float)
+        if not np.allclose(a, b, rtol=rtol, atol=atol, equal_nan=True):
+            n_nan = int(np.sum(np.isnan(a) != np.isnan(b)))
+            raise Exception(f"Parallel and serial fits differ in column {col} ({n_nan} genes differ in NA status)")
+        both = ~np.isnan(a) & ~np.isnan(b)
+        if both.any():
+            max_diff = max(max_diff, float(np.max(np.abs(a[both] - b[both]))))
+    return max_diff
+
+
+def time_fit(df: pd.DataFrame, design: str, method: str, n_shards: int, outfile: Path) -> float:
+    start = time.perf_counter()
+    run_dea(df, str(outfile), method, True, design=design, n_shards=n_shards)
+    return time.perf_counter() - start
+
+
+def benchmark_methods(count_matrix_path: str, design: str, n_shards: int, repeats: int = 3) -> pd.DataFrame:
+    """Time serial edgeR and DESeq2 fits, and DESeq2 with n_shards cores.
+
+    Parameters
+    ----------
+    count_matrix_path : str
+        Path to raw count matrix.
+    design : str
+        "paired", "unpaired" or path to csv file with covariates.
+    n_shards : int
+        BiocParallel workers for the parallel DESeq2 fit. edgeR is always fitted serially, as its QL fit shares
+        information across genes.
+    repeats : int, optional
+        Timed fits per configuration, by default 3.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per configuration with median and minimum seconds, speedup relative to serial DESeq2, the maximum
+        absolute difference in logFC, p-value and FDR to the serial fit of the same method, and the R and package
+        versions.
+    """
+    df = pd.read_csv(count_matrix_path, index_col=0)
+    configurations = [("edger", 1), ("deseq2", 1)]
+    if n_shards > 1:
+        configurations.append(("deseq2", n_shards))
+
+    rows = []
+    serial_results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for method, shards in configurations:
+            outfile = Path(f"{tmpdir}/{method}_{shards}.csv")
+            time_fit(df, design, method, shards, outfile)  # warm-up
+            seconds = [time_fit(df, design, method, shards, outfile) for _ in range(repeats)]
+
+            table = pd.read_csv(outfile, index_col=0)
+            if shards == 1:
+                serial_results[method] = table
+            rows.append(
+                {
+                    "method": method,
+                    "shards": shards,
+                    "median_seconds": float(np.median(seconds)),
+                    "min_seconds": float(np.min(seconds)),
+                    "max_abs_diff": compare_tables(table, serial_results[method]),
+                    "versions": dea_versions(method),
+                }
+            )
+
+    results = pd.DataFrame(rows)
+    serial_deseq2 = results.loc[(results["method"] == "deseq2") & (results["shards"] == 1), "median_seconds"].iloc[0]
+    results["speedup_vs_serial_deseq2"] = serial_deseq2 / results["median_seconds"]
+    return results
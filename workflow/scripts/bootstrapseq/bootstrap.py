@@ -10,8 +10,6 @@ import numpy as np
 import pandas as pd
 from scipy.stats import spearmanr
 
-from DEA import run_dea
-
 
 def compute_spearmans(tab_reference: pd.DataFrame | pd.Series, merged_trials: pd.DataFrame) -> Optional[np.ndarray]:
     """Compute logFC Spearman rank correlation for each trial relative to a reference.
@@ -113,6 +111,8 @@ def bootstrap_data(
     Exception
         Provided df has unequal number of replicates per condition.
     """
+    from .DEA import run_dea  # rpy2/R are only needed to fit, not to compute results
+
     results = None
 
     # TO DO: unbalanced number of samples per condition
@@ -158,13 +158,12 @@ def bootstrap_data(
 
             logging.info(f"Running trial: {trial}, samples: {df_bag.columns}, path: {save_path}")
 
+            design_sub: str | pd.DataFrame
             if design == "custom" and meta is not None:
+                # Passed to R as a data frame, rows renamed like the resampled columns below
                 meta_sub = meta.loc[df_bag.columns]
-                meta_sub.copy()
-                # add suffix to filename avoid multiprocess conflict
-                design_sub = f"{save_path}/tmp/design.trial{trial}.csv"
                 meta_sub.index = pd.Index([col + str(i) for i, col in enumerate(meta_sub.index)])
-                meta_sub.to_csv(design_sub)
+                design_sub = meta_sub
             elif design in ["paired", "unpaired"]:
                 design_sub = design
 
@@ -0,0 +1,117 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .metrics import compute_metrics
+from .metrics import jackknife_spearmans
+from .metrics import read_merged_trials
+
+
+# Metric columns from compute_metrics() and their key prefixes in the stats file
+METRIC_KEYS = {"Spear": "spearman", "Kendall": "kendall", "KL": "kl", "TopK": "topk"}
+
+
+def process_results(savepath: str, name: str, trials: int, make_figs: bool, chunk_size: int = 256) -> None:
+    original_results = pd.read_csv(Path(f"{savepath}/{name}_original.csv"), index_col=0)
+    # The merged file is read chunk_size trials at a time, assuming trials have about as many genes as the original
+    merged_trials = read_merged_trials(
+        Path(f"{savepath}/{name}_trials_merged_{trials}.csv"), rows=chunk_size * len(original_results)
+    )
+    metrics = compute_metrics(original_results, merged_trials, chunk_size=chunk_size)
+    spearmans = metrics["Spear"].dropna().to_numpy()
+
+    if len(spearmans) == 0:
+        raise Exception("No Speamans found")
+
+    dictionary = summarize({key: metrics[metric] for metric, key in METRIC_KEYS.items()})
+    write_stats(dictionary, Path(f"{savepath}/{name}_stats.json"))
+
+    if make_figs:
+        plot(spearmans, savepath, name)
+
+
+def summarize(values: dict[str, pd.Series]) -> dict:
+    """Median, mean, std and all non-NaN values per metric, keyed as in the stats file.
+
+    Summaries of metrics without any non-NaN value, e.g. TopK when the reference has no DEGs, are null.
+    """
+    dictionary: dict = {}
+    for key, series in values.items():
+        array = series.dropna().to_numpy()
+        empty = len(array) == 0
+        dictionary[f"{key}_median"] = None if empty else float(np.median(array))
+        dictionary[f"{key}_mean"] = None if empty else float(np.mean(array))
+        dictionary[f"{key}_std"] = None if empty else float(np.std(array))
+        dictionary[f"{key}s"] = array.tolist()
+    return dictionary
+
+
+def write_stats(dictionary: dict, outfile: Path) -> None:
+    json_object = json.dumps(dictionary, indent=4, allow_nan=False)
+
+    with open(outfile, "w") as f:
+        f.write(json_object)
+
+
+def process_jackknife(
+    savepath: str,
+    name: str,
+    fits: int,
+    original_seconds: float,
+    fit_seconds: list[float],
+    bootstrap_seconds: list[float],
+    bootstrap_trials: int,
+) -> None:
+    """Summarize leave-one-out fits in {name}_jackknife_stats.json, in the format of the bootstrap stats file.
+
+    The spearman_* entries are the bias-corrected jackknife estimates on the bootstrap scale; the raw leave-one-out
+    correlations are stored as spearman_loo_*. The jackknife wall time (original fit plus leave-one-out fits) is
+    compared against the original fit plus bootstrap_trials fits at the mean duration of the timed bootstrap trials.
+    """
+    jackknife_name = f"{name}_jackknife"
+    original_results = pd.read_csv(Path(f"{savepath}/{jackknife_name}_original.csv"), index_col=0)
+    jackknife_trials = pd.concat(
+        [pd.read_csv(Path(f"{savepath}/{jackknife_name}_trial_{i}.csv"), index_col=0) for i in range(1, fits + 1)]
+    )
+    spearmans = jackknife_spearmans(original_results, jackknife_trials)
+
+    dictionary = summarize({"spearman": spearmans["SpearBC"], "spearman_loo": spearmans["Spear"]})
+    jackknife_seconds = original_seconds + float(np.sum(fit_seconds))
+    seconds_per_bootstrap_fit = float(np.mean(bootstrap_seconds))
+    estimated_bootstrap_seconds = original_seconds + bootstrap_trials * seconds_per_bootstrap_fit
+    dictionary.update(
+        {
+            "jackknife_fits": fits,
+            "original_seconds": original_seconds,
+            "jackknife_seconds": jackknife_seconds,
+            "seconds_per_jackknife_fit": float(np.mean(fit_seconds)),
+            "timed_bootstrap_fits": len(bootstrap_seconds),
+            "seconds_per_bootstrap_fit": seconds_per_bootstrap_fit,
+            "bootstrap_trials": bootstrap_trials,
+            "estimated_bootstrap_seconds": estimated_bootstrap_seconds,
+            "walltime_ratio": jackknife_seconds / estimated_bootstrap_seconds,
+        }
+    )
+    write_stats(dictionary, Path(f"{savepath}/{jackknife_name}_stats.json"))
+
+
+def plot(spearmans: np.ndarray, savepath: str, name: str) -> None:
+    # Imported here so that computing results does not pay for matplotlib/seaborn when make_figs is off
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # dummy plot for now
+    sns.kdeplot(spearmans)
+    plt.savefig(f"{savepath}/{name}_spearman.pdf")
+
+
+if __name__ == "__main__":
+    savepath = sys.argv[1]
+    name = sys.argv[2]
+    trials = int(sys.argv[3])
+    make_figs = bool(sys.argv[4])
+
+    process_results(savepath, name, trials, make_figs)
@@ -0,0 +1,295 @@
+"""Command line interface for BootstrapSeq.
+
+Subcommands import their dependencies (pandas, rpy2/R, matplotlib, seaborn) only when they run, so that starting
+the CLI and parsing arguments stays cheap for every Snakemake job.
+"""
+
+import argparse
+import logging
+import sys
+
+
+def str_to_bool(value: str) -> bool:
+    """Parse booleans as written by Snakemake/YAML ("True", "false", "1", ...)"""
+    if value.lower() in ["true", "1", "yes"]:
+        return True
+    if value.lower() in ["false", "0", "no"]:
+        return False
+    raise argparse.ArgumentTypeError(f"Expected a boolean, got: {value}")
+
+
+def add_trial_arguments(parser: argparse.ArgumentParser, bootstrap: bool = True) -> None:
+    parser.add_argument("count_matrix_path", help="Path to raw count matrix")
+    parser.add_argument("design", help='"paired", "unpaired" or path to csv file with covariates')
+    parser.add_argument("--method", default="edger", choices=["edger", "deseq2"], help="DEA method")
+    parser.add_argument(
+        "--shards", type=int, default=1, help="DESeq2 BiocParallel workers (cores per trial); edgeR trials use 1"
+    )
+    if bootstrap:
+        parser.add_argument(
+            "--bootstrap", default="resample", choices=["resample", "multinomial", "bayesian"], help="Bootstrap scheme"
+        )
+    parser.add_argument("--cache-dir", help="Content-addressed trial cache shared across runs")
+    parser.add_argument(
+        "--precompute-norm", action="store_true", help="Compute normalization factors in NumPy instead of R"
+    )
+    parser.add_argument("--cache-max-gb", type=float, help="Evict least recently used cache entries beyond this size")
+
+
+def trial_options(args: argparse.Namespace) -> dict:
+    """Keyword arguments for run_trial() shared by all subcommands that run trials"""
+    return {
+        "n_shards": args.shards,
+        "bootstrap": getattr(args, "bootstrap", "resample"),
+        "cache_dir": args.cache_dir,
+        "cache_max_bytes": None if args.cache_max_gb is None else int(args.cache_max_gb * 1e9),
+        "precompute_norm": args.precompute_norm,
+        "method": args.method,
+    }
+
+
+def cmd_run_trial(args: argparse.Namespace) -> None:
+    from .run_trial import run_trial
+
+    run_trial(args.savepath, args.name, args.trial, args.count_matrix_path, args.design, **trial_options(args))
+
+
+def cmd_run_batch(args: argparse.Namespace) -> None:
+    from .run_trial import run_trial
+
+    # One process for the whole batch: R and the count matrix reader are only started once
+    for trial in range(args.first, args.last + 1):
+        logging.info(f"Running trial {trial} of {args.first}-{args.last}")
+        run_trial(args.savepath, args.name, trial, args.count_matrix_path, args.design, **trial_options(args))
+
+
+def cmd_jackknife(args: argparse.Namespace) -> None:
+    import os
+    import tempfile
+    import time
+
+    import pandas as pd
+
+    from .compute_results import process_jackknife
+    from .run_trial import jackknife_units
+    from .run_trial import run_trial
+
+    columns = pd.read_csv(args.count_matrix_path, index_col=0, nrows=0)
+    design = pd.read_csv(args.design, index_col=0) if os.path.isfile(args.design) else args.design
+    fits = jackknife_units(columns, design)
+    name = f"{args.name}_jackknife"
+    if args.cache_dir is not None:
+        logging.warning("Ignoring --cache-dir: cache hits would make the timings meaningless")
+    # Every fit is timed, so all of them are computed
+    options = trial_options(args) | {"cache_dir": None}
+
+    def timed_trial(savepath: str, name: str, trial: int, bootstrap: str) -> float:
+        start = time.perf_counter()
+        run_trial(savepath, name, trial, args.count_matrix_path, args.design, **(options | {"bootstrap": bootstrap}))
+        return time.perf_counter() - start
+
+    original_seconds = timed_trial(args.savepath, name, 0, "jackknife")
+    fit_seconds = [timed_trial(args.savepath, name, trial, "jackknife") for trial in range(1, fits + 1)]
+
+    # Bootstrap fits use all columns, so their cost is measured on a few resample trials, not extrapolated
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bootstrap_seconds = [timed_trial(tmpdir, name, trial, "resample") for trial in range(1, args.timing_trials + 1)]
+
+    process_jackknife(
+        args.savepath, args.name, fits, original_seconds, fit_seconds, bootstrap_seconds, args.bootstrap_trials
+    )
+    # The stats file holds all per-fit results; the original fit is kept as the reference table
+    for trial in range(1, fits + 1):
+        os.remove(f"{args.savepath}/{name}_trial_{trial}.csv")
+
+
+def cmd_worker(args: argparse.Namespace) -> None:
+    from pathlib import Path
+
+    from .run_trial import run_trial
+    from .work_queue import init_queue
+    from .work_queue import run_worker
+
+    if args.trials is not None:
+        init_queue(args.queue, args.trials, args.block_size)
+
+    def is_complete(trial: int) -> bool:
+        suffix = "original" if trial == 0 else f"trial_{trial}"
+        return Path(f"{args.savepath}/{args.name}_{suffix}.csv").exists()
+
+    def run(trial: int) -> None:
+        run_trial(args.savepath, args.name, trial, args.count_matrix_path, args.design, **trial_options(args))
+
+    run_worker(args.queue, run, is_complete, lease_seconds=args.lease)
+
+
+def cmd_queue_status(args: argparse.Namespace) -> None:
+    from pathlib import Path
+
+    from .work_queue import completed_trials
+    from .work_queue import queue_status
+
+    if not (Path(args.queue) / "pending").is_dir():
+        sys.exit(f"No queue found: {args.queue}")
+    status = queue_status(args.queue)
+    print(" ".join(f"{state}: {count}" for state, count in status.items()))
+    print(f"completed trials: {len(completed_trials(args.queue))}")
+    if status["pending"] or status["claimed"]:
+        sys.exit(1)
+
+
+def cmd_cache(args: argparse.Namespace) -> None:
+    import datetime
+
+    from .trial_cache import cache_info
+    from .trial_cache import evict
+
+    if args.evict_to_gb is not None:
+        evict(args.cache_dir, int(args.evict_to_gb * 1e9))
+
+    info = cache_info(args.cache_dir)
+    print(f"entries: {info['entries']}")
+    print(f"size: {info['bytes'] / 1e9:.3f} GB")
+    for key in ["oldest", "newest"]:
+        if info[key] is not None:
+            print(f"{key} access: {datetime.datetime.fromtimestamp(info[key])}")
+
+
+def cmd_merge(args: argparse.Namespace) -> None:
+    from .merge_trials import main as merge
+
+    trial_numbers = None
+    if args.queue is not None:
+        from .work_queue import completed_trials
+
+        trial_numbers = [trial for trial in completed_trials(args.queue) if trial > 0]
+    merge(args.savepath, args.name, args.trials, args.clean_up, trial_numbers)
+
+
+def cmd_results(args: argparse.Namespace) -> None:
+    from .compute_results import process_results
+
+    process_results(args.savepath, args.name, args.trials, args.make_figs)
+
+
+def cmd_plot(args: argparse.Namespace) -> None:
+    import json
+
+    import numpy as np
+
+    from .compute_results import plot
+
+    with open(f"{args.savepath}/{args.name}_stats.json") as f:
+        spearmans = np.array(json.load(f)["spearmans"])
+    plot(spearmans, args.savepath, args.name)
+
+
+def cmd_benchmark(args: argparse.Namespace) -> None:
+    from .benchmark import benchmark_methods
+
+    results = benchmark_methods(args.count_matrix_path, args.design, args.shards, args.repeats)
+    print(results.to_string(index=False))
+    if args.out is not None:
+        results.to_csv(args.out, index=False)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bootstrapseq", description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log progress messages")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sub = subparsers.add_parser("run-trial", help="Run a single bootstrap trial (trial 0 is the original data)")
+    sub.add_argument("savepath")
+    sub.add_argument("name")
+    sub.add_argument("trial", type=int)
+    add_trial_arguments(sub)
+    sub.set_defaults(func=cmd_run_trial)
+
+    sub = subparsers.add_parser("run-batch", help="Run a range of trials in one process")
+    sub.add_argument("savepath")
+    sub.add_argument("name")
+    add_trial_arguments(sub)
+    sub.add_argument("--first", type=int, required=True, help="First trial number")
+    sub.add_argument("--last", type=int, required=True, help="Last trial number (inclusive)")
+    sub.set_defaults(func=cmd_run_batch)
+
+    sub = subparsers.add_parser(
+        "jackknife", help="Quick look: leave-one-out (or leave-one-pair-out) fits instead of bootstrap trials"
+    )
+    sub.add_argument("savepath")
+    sub.add_argument("name")
+    # Leave-one-out fits and the timed resample trials set the scheme themselves
+    add_trial_arguments(sub, bootstrap=False)
+    sub.add_argument(
+        "--bootstrap-trials", type=int, default=1000, help="Bootstrap size to compare the wall time against"
+    )
+    sub.add_argument(
+        "--timing-trials", type=int, default=1, help="Resample trials timed to estimate the cost of a bootstrap fit"
+    )
+    sub.set_defaults(func=cmd_jackknife)
+
+    sub = subparsers.add_parser("benchmark", help="Time edgeR, serial DESeq2 and parallel DESeq2 on the full data")
+    sub.add_argument("count_matrix_path", help="Path to raw count matrix")
+    sub.add_argument("design", help='"paired", "unpaired" or path to csv file with covariates')
+    sub.add_argument("--shards", type=int, default=4, help="Workers for the parallel DESeq2 fit")
+    sub.add_argument("--repeats", type=int, default=3, help="Timed fits per configuration")
+    sub.add_argument("--out", help="Also write the timings to this csv file")
+    sub.set_defaults(func=cmd_benchmark)
+
+    sub = subparsers.add_parser("worker", help="Claim and run blocks of trials from a shared-filesystem queue")
+    sub.add_argument("savepath")
+    sub.add_argument("name")
+    add_trial_arguments(sub)
+    sub.add_argument("--queue", required=True, help="Queue directory on the shared filesystem")
+    sub.add_argument("--trials", type=int, help="Create (or extend) the queue with trials 0..TRIALS before working")
+    sub.add_argument("--block-size", type=int, default=1, help="Trials per block when creating the queue")
+    sub.add_argument("--lease", type=float, default=3600, help="Lease duration in seconds, renewed after each trial")
+    sub.set_defaults(func=cmd_worker)
+
+    sub = subparsers.add_parser("queue-status", help="Show queue progress; exits 1 while trials are outstanding")
+    sub.add_argument("queue")
+    sub.set_defaults(func=cmd_queue_status)
+
+    sub = subparsers.add_parser("cache", help="Inspect the trial cache and optionally evict entries")
+    sub.add_argument("cache_dir")
+    sub.add_argument("--evict-to-gb", type=float, help="Evict least recently used entries down to this size")
+    sub.set_defaults(func=cmd_cache)
+
+    sub = subparsers.add_parser("merge", help="Merge trial tables into a single csv file")
+    sub.add_argument("savepath")
+    sub.add_argument("name")
+    sub.add_argument("trials", type=int)
+    sub.add_argument("--clean-up", type=str_to_bool, default=True, help="Delete individual trials after merging")
+    sub.add_argument("--queue", help="Only merge trials from completed blocks of this queue")
+    sub.set_defaults(func=cmd_merge)
+
+    sub = subparsers.add_parser("results", help="Compute summary statistics from merged trials")
+    sub.add_argument("savepath")
+    sub.add_argument("name")
+    sub.add_argument("trials", type=int)
+    sub.add_argument("--make-figs", type=str_to_bool, default=False, help="Also plot the Spearman distribution")
+    sub.set_defaults(func=cmd_results)
+
+    sub = subparsers.add_parser("plot", help="Plot the Spearman distribution from computed statistics")
+    sub.add_argument("savepath")
+    sub.add_argument("name")
+    sub.set_defaults(func=cmd_plot)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "method", None) == "deseq2" and getattr(args, "bootstrap", None) in ["multinomial", "bayesian"]:
+        # DESeq2 does not treat observation weights as frequency weights, see run_trial
+        parser.error(f"--bootstrap {args.bootstrap} requires --method edger")
+    if getattr(args, "method", None) == "edger" and getattr(args, "shards", 1) > 1:
+        # The edgeR QL fit is not sharded, see run_trial
+        parser.error("--shards > 1 requires --method deseq2")
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -3,9 +3,13 @@ import logging
 import os
 import sys
 from pathlib import Path
+from typing import Optional
 
 
-def main(savepath: str, name: str, trials: int, clean_up: bool) -> None:
+logger = logging.getLogger()
+
+
+def main(savepath: str, name: str, trials: int, clean_up: bool, trial_numbers: Optional[list[int]] = None) -> None:
     old_merged_file_query = Path(f"{savepath}/{name}_trials_merged_*.csv")
     final_output = Path(f"{savepath}/{name}_trials_merged_{trials}.csv")
     matched_files = glob.glob(str(old_merged_file_query))
@@ -15,12 +19,16 @@ def main(savepath: str, name: str, trials: int, clean_up: bool) -> None:
         logger.info(f"Found: {existing_trials} existring trials, appending new ones...")
     else:
         logger.info("No merged file found, initializing...")
-        old_merged_file = None
+        old_merged_file = str(final_output)
         os.system(f"touch {final_output}")
 
     trial_files = Path(f"{savepath}/{name}_trial_*.csv")
     matched_files = sorted(glob.glob(str(trial_files)))
 
+    # Only merge trials known to be complete, e.g. from the done blocks of a work queue
+    if trial_numbers is not None:
+        matched_files = [tf for tf in matched_files if int(tf.split("_trial_")[-1].split(".csv")[0]) in trial_numbers]
+
     if not matched_files:
         logging.info("No trials found...")
         return
@@ -28,19 +36,20 @@ def main(savepath: str, name: str, trials: int, clean_up: bool) -> None:
     for tf in matched_files:
         trial = int(tf.split("_trial_")[-1].split(".csv")[0])
         logger.info(trial)
-        if trial == 1:
-            os.system(f"head -n 1 {tf} > {old_merged_file}")  # Write header from the first trial
+        if os.path.getsize(old_merged_file) == 0:
+            # Header from the first merged trial, which is not trial 1 when merging a subset of trials
+            os.system(f"head -n 1 {tf} > {old_merged_file}")
         os.system(f"tail -n +2 -q {tf} >> {old_merged_file}")  # Append all trials, skipping headers
 
         if clean_up:
             os.system(f"rm {tf}")
 
-    os.system(f"mv {old_merged_file} {final_output}")
+    if Path(old_merged_file) != final_output:
+        os.system(f"mv {old_merged_file} {final_output}")
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger()
 
     savepath = sys.argv[1]
     name = sys.argv[2]
@@ -0,0 +1,228 @@
+from pathlib import Path
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.stats import kendalltau
+from scipy.stats import rankdata
+
+
+METRICS = ["Spear", "Kendall", "KL", "TopK"]
+
+
+def iter_trial_matrices(
+    merged_trials: pd.DataFrame, genes: pd.Index, columns: list[str], chunk_size: int
+) -> Iterator[tuple[np.ndarray, list[np.ndarray]]]:
+    """Yield genes x trials matrices for chunks of trials, aligned to genes.
+
+    Parameters
+    ----------
+    merged_trials : pandas.DataFrame
+        Long table with all trial results concatenated, indexed by gene, with a column "Trial".
+    genes : pandas.Index
+        Genes (rows) of the yielded matrices; genes missing from a trial are NaN.
+    columns : list of str
+        Columns of merged_trials to return as matrices, e.g. ["logFC", "FDR"].
+    chunk_size : int
+        Maximum number of trials per chunk.
+
+    Yields
+    ------
+    tuple
+        Trial numbers of the chunk and a list with one (len(genes), len(trials)) matrix per column.
+    """
+    positions = merged_trials.groupby("Trial").indices
+    trials = np.sort(np.fromiter(positions, dtype=int))
+
+    for start in range(0, len(trials), chunk_size):
+        chunk = trials[start : start + chunk_size]
+        matrices = [np.full((len(genes), len(chunk)), np.nan) for _ in columns]
+        for j, trial in enumerate(chunk):
+            trial_results = merged_trials.iloc[positions[trial]]
+            rows = genes.get_indexer(trial_results.index)
+            found = rows >= 0
+            for matrix, column in zip(matrices, columns, strict=True):
+                matrix[rows[found], j] = trial_results[column].to_numpy()[found]
+        yield chunk, matrices
+
+
+def read_merged_trials(path: str | Path, rows: int) -> Iterator[pd.DataFrame]:
+    """Read a merged trials file in pieces of about rows rows, each holding complete trials.
+
+    Trials are appended to the merged file one after the other (see merge_trials.py), so only the last trial of a
+    piece can continue in the next piece; its rows are carried over.
+    """
+    carry: Optional[pd.DataFrame] = None
+    for piece in pd.read_csv(path, index_col=0, chunksize=rows):
+        if carry is not None:
+            piece = pd.concat([carry, piece])
+        complete = piece["Trial"].to_numpy() != piece["Trial"].iloc[-1]
+        carry = piece[~complete]
+        if complete.any():
+            yield piece[complete]
+    if carry is not None and len(carry) > 0:
+        yield carry
+
+
+def spearman_columns(reference: np.ndarray, trials: np.ndarray) -> np.ndarray:
+    """Spearman correlation of reference with each column of trials, over the genes non-NaN in both."""
+    mask = ~np.isnan(trials) & ~np.isnan(reference)[:, None]
+    ref = np.where(mask, reference[:, None], np.nan)
+    x = np.where(mask, trials, np.nan)
+
+    # Ranks are computed within each column's common genes, as if NaNs were dropped first
+    ref_ranks = rankdata(ref, axis=0, nan_policy="omit")
+    x_ranks = rankdata(x, axis=0, nan_policy="omit")
+    ref_ranks -= np.nanmean(ref_ranks, axis=0)
+    x_ranks -= np.nanmean(x_ranks, axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nansum(ref_ranks * x_ranks, axis=0) / np.sqrt(
+            np.nansum(ref_ranks**2, axis=0) * np.nansum(x_ranks**2, axis=0)
+        )
+
+
+def kendall_columns(reference: np.ndarray, trials: np.ndarray) -> np.ndarray:
+    """Kendall's tau-b of reference with each column of trials, over the genes non-NaN in both."""
+    taus = np.full(trials.shape[1], np.nan)
+    for j in range(trials.shape[1]):
+        # tau-b has no closed-form vectorization across columns; scipy's O(n log n) algorithm is used per trial
+        common = ~np.isnan(trials[:, j]) & ~np.isnan(reference)
+        if common.sum() > 1:
+            taus[j] = kendalltau(reference[common], trials[common, j], variant="b").statistic
+    return taus
+
+
+def kl_columns(reference: np.ndarray, trials: np.ndarray, bins: int = 100, eps: float = 1e-10) -> np.ndarray:
+    """KL divergence D(reference || trial) between the logFC distributions, estimated on shared histogram bins."""
+    values = reference[~np.isnan(reference)]
+    edges = np.linspace(values.min(), values.max(), bins + 1)
+
+    def densities(x: np.ndarray) -> np.ndarray:
+        # Values outside the reference range are counted in the outermost bins
+        idx = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, bins - 1)
+        idx = np.where(np.isnan(x), bins, idx) + (bins + 1) * np.arange(x.shape[1])
+        counts = np.bincount(idx.ravel(), minlength=(bins + 1) * x.shape[1]).reshape(x.shape[1], bins + 1)[:, :-1]
+        counts = counts.T + eps
+        return counts / counts.sum(axis=0)
+
+    p = densities(values[:, None])
+    q = densities(trials)
+    return np.sum(p * np.log(p / q), axis=0)
+
+
+def top_k_overlap_columns(
+    reference_fdr: np.ndarray, reference_lfc: np.ndarray, fdr: np.ndarray, lfc: np.ndarray, k: int
+) -> np.ndarray:
+    """Fraction of the reference top-k genes (by FDR, ties broken by |logFC|) among the top-k genes of each trial."""
+    if k == 0:
+        return np.full(fdr.shape[1], np.nan)
+
+    def top_k(fdr: np.ndarray, lfc: np.ndarray) -> np.ndarray:
+        order = np.lexsort((-np.nan_to_num(np.abs(lfc)), np.nan_to_num(fdr, nan=np.inf)), axis=0)
+        return order[:k]
+
+    in_reference = np.zeros(len(reference_fdr), dtype=bool)
+    in_reference[top_k(reference_fdr[:, None], reference_lfc[:, None])[:, 0]] = True
+    return in_reference[top_k(fdr, lfc)].sum(axis=0) / k
+
+
+def compute_metrics(
+    tab_reference: pd.DataFrame,
+    merged_trials: pd.DataFrame | Iterable[pd.DataFrame],
+    metrics: Optional[list[str]] = None,
+    top_k: Optional[int] = None,
+    fdr: float = 0.05,
+    bins: int = 100,
+    chunk_size: int = 256,
+) -> pd.DataFrame:
+    """Compute reproducibility metrics for each trial relative to a reference in one pass over the trials.
+
+    Trials are processed in chunks of genes x trials matrices. When merged_trials is an iterable of pieces, e.g. from
+    read_merged_trials(), only one piece is held in memory at a time, so memory is bounded by the piece and chunk
+    sizes rather than by the number of trials.
+
+    Parameters
+    ----------
+    tab_reference : pandas.DataFrame
+        Output table from edgeR or DESeq2 for the original data, with columns "logFC" and "FDR".
+    merged_trials : pandas.DataFrame or iterable of pandas.DataFrame
+        Output tables of all trials concatenated, with an additional column "Trial", or pieces of it that each hold
+        complete trials.
+    metrics : list of str, optional
+        Subset of "Spear" (Spearman correlation of logFC), "Kendall" (Kendall's tau-b of logFC), "KL" (KL divergence
+        of the logFC distributions) and "TopK" (top-k DEG overlap), by default all.
+    top_k : int, optional
+        Number of top-ranked genes for "TopK", by default the number of reference DEGs at fdr.
+    fdr : float, optional
+        FDR threshold defining reference DEGs when top_k is not given, by default 0.05.
+    bins : int, optional
+        Number of histogram bins for "KL", by default 100.
+    chunk_size : int, optional
+        Number of trials processed at once, by default 256.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per trial, one column per metric.
+    """
+    metrics = METRICS if metrics is None else metrics
+    genes = tab_reference.index
+    reference_lfc = tab_reference["logFC"].to_numpy(dtype=float)
+    reference_fdr = tab_reference["FDR"].to_numpy(dtype=float)
+    if top_k is None:
+        top_k = int(np.sum(reference_fdr < fdr))
+
+    pieces = [merged_trials] if isinstance(merged_trials, pd.DataFrame) else merged_trials
+    results = []
+    for piece in pieces:
+        for trials, (lfc, trial_fdr) in iter_trial_matrices(piece, genes, ["logFC", "FDR"], chunk_size):
+            chunk = pd.DataFrame(index=pd.Index(trials, name="Trial"))
+            if "Spear" in metrics:
+                chunk["Spear"] = spearman_columns(reference_lfc, lfc)
+            if "Kendall" in metrics:
+                chunk["Kendall"] = kendall_columns(reference_lfc, lfc)
+            if "KL" in metrics:
+                chunk["KL"] = kl_columns(reference_lfc, lfc, bins=bins)
+            if "TopK" in metrics:
+                chunk["TopK"] = top_k_overlap_columns(reference_fdr, reference_lfc, trial_fdr, lfc, top_k)
+            results.append(chunk)
+
+    return pd.concat(results).sort_index()
+
+
+def jackknife_spearmans(tab_reference: pd.DataFrame, jackknife_trials: pd.DataFrame) -> pd.DataFrame:
+    """Spearman correlations of leave-one-out fits with the reference, raw and on the bootstrap scale.
+
+    Leave-one-out logFC estimates deviate less from the reference than bootstrap estimates do. Per gene, the
+    replicates theta_jack + sqrt(n - 1) * (theta_(i) - mean(theta_(.))) have the jackknife variance and are centred on
+    the bias-corrected estimate theta_jack = n * theta - (n - 1) * mean(theta_(.)), which makes their correlations with
+    the reference comparable to the bootstrap Spearman correlations.
+
+    Parameters
+    ----------
+    tab_reference : pandas.DataFrame
+        Output table for the full data, with a column "logFC".
+    jackknife_trials : pandas.DataFrame
+        Output tables of all leave-one-out fits concatenated, with an additional column "Trial".
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per leave-one-out fit, with columns "Spear" (raw) and "SpearBC" (bias-corrected, bootstrap scale).
+    """
+    genes = tab_reference.index
+    reference = tab_reference["logFC"].to_numpy(dtype=float)
+    n = jackknife_trials["Trial"].nunique()
+    ((trials, (lfc,)),) = iter_trial_matrices(jackknife_trials, genes, ["logFC"], chunk_size=n)
+
+    lfc_mean = np.nanmean(lfc, axis=1, keepdims=True)
+    bias_corrected = n * reference[:, None] - (n - 1) * lfc_mean
+    replicates = bias_corrected + np.sqrt(n - 1) * (lfc - lfc_mean)
+
+    return pd.DataFrame(
+        {"Spear": spearman_columns(reference, lfc), "SpearBC": spearman_columns(reference, replicates)},
+        index=pd.Index(trials, name="Trial"),
+    )
@@ -16,6 +16,8 @@ pretty_met = {
     "kurt": "Kurtosis",
     "Spear": "Spearman correlation",
     "KL": "KL Divergence",
+    "Kendall": "Kendall's tau",
+    "TopK": "Top-k overlap",
     "Rep": "Replicability",
     "Prec": "Precision",
     "Rec": "Recall",
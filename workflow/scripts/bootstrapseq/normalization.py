@@ -0,0 +1,184 @@
+"""NumPy implementations of DESeq2 median-of-ratios size factors and edgeR TMM normalization factors.
+
+Both follow the R implementations (DESeq2::estimateSizeFactorsForMatrix and edgeR::calcNormFactors with
+method="TMM" and default arguments) and can compute factors for many bootstrap resamples at once. A resample is
+given either as column indices into the count matrix (duplicates allowed, as in bootstrap_resample) or as per-column
+weights (as in sample_weights), where integer weights are equivalent to duplicating columns.
+"""
+
+from typing import Optional
+
+import numpy as np
+from scipy.stats import rankdata
+
+
+def _as_weights(n_samples: int, indices: Optional[np.ndarray], weights: Optional[np.ndarray]) -> np.ndarray:
+    """Convert index or weight arrays of resamples to a (resamples, samples) weight matrix"""
+    if indices is not None and weights is not None:
+        raise Exception("Provide either indices or weights, not both")
+    if indices is not None:
+        indices = np.atleast_2d(indices)
+        weights = np.zeros((len(indices), n_samples))
+        for b, ind in enumerate(indices):
+            weights[b] = np.bincount(ind, minlength=n_samples)
+        return weights
+    if weights is not None:
+        return np.atleast_2d(np.asarray(weights, dtype=float))
+    return np.ones((1, n_samples))
+
+
+def _gather(factors: np.ndarray, indices: Optional[np.ndarray], weights: Optional[np.ndarray]) -> np.ndarray:
+    """Shape the (resamples, samples) factors like the input: per drawn column for indices, 1D without resamples"""
+    if indices is not None:
+        out = np.take_along_axis(factors, np.atleast_2d(indices), axis=1)
+        return out[0] if np.ndim(indices) == 1 else out
+    if weights is not None and np.ndim(weights) > 1:
+        return factors
+    return factors[0]
+
+
+def size_factors(
+    counts: np.ndarray,
+    indices: Optional[np.ndarray] = None,
+    weights: Optional[np.ndarray] = None,
+    chunk_bytes: int = 1 << 28,
+) -> np.ndarray:
+    """DESeq2 median-of-ratios size factors.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        Raw counts, genes x samples.
+    indices : numpy.ndarray, optional
+        Column indices of resamples, shape (resamples, columns) or (columns,).
+    weights : numpy.ndarray, optional
+        Column weights of resamples, shape (resamples, samples) or (samples,).
+    chunk_bytes : int, optional
+        Approximate memory bound for the intermediate genes x resamples x samples array, by default 256 MB.
+
+    Returns
+    -------
+    numpy.ndarray
+        Size factors with the shape of indices or weights; 1D over all samples if neither is given.
+    """
+    counts = np.asarray(counts, dtype=float)
+    w = _as_weights(counts.shape[1], indices, weights)
+    drawn = w > 0
+
+    with np.errstate(divide="ignore"):
+        log_counts = np.log(counts)
+    # Genes with a zero count in any drawn sample have geometric mean zero and are excluded, as in DESeq2
+    has_zero = (counts == 0).astype(float)
+    valid = (has_zero @ drawn.T) == 0
+    log_counts_finite = np.where(counts > 0, log_counts, 0)
+    loggeomeans = (log_counts_finite @ w.T) / w.sum(axis=1)
+
+    genes, samples = counts.shape
+    chunk = max(1, chunk_bytes // (8 * genes * samples))
+    factors = np.empty(w.shape)
+    for start in range(0, len(w), chunk):
+        stop = start + chunk
+        ratios = log_counts[:, None, :] - loggeomeans[:, start:stop, None]
+        ratios[~valid[:, start:stop]] = np.nan
+        factors[start:stop] = np.exp(np.nanmedian(ratios, axis=0))
+
+    return _gather(factors, indices, weights)
+
+
+def _tmm_pair(
+    obs: np.ndarray,
+    ref: np.ndarray,
+    lib_obs: float,
+    lib_ref: float,
+    logratio_trim: float = 0.3,
+    sum_trim: float = 0.05,
+    acutoff: float = -1e10,
+) -> float:
+    """Weighted trimmed mean of M-values of obs relative to ref (edgeR's .calcFactorTMM)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_r = np.log2((obs / lib_obs) / (ref / lib_ref))
+        abs_e = (np.log2(obs / lib_obs) + np.log2(ref / lib_ref)) / 2
+        v = (lib_obs - obs) / lib_obs / obs + (lib_ref - ref) / lib_ref / ref
+
+    fin = np.isfinite(log_r) & np.isfinite(abs_e) & (abs_e > acutoff)
+    log_r, abs_e, v = log_r[fin], abs_e[fin], v[fin]
+    if len(log_r) == 0:
+        return 1.0
+    if np.max(np.abs(log_r)) < 1e-6:
+        return 1.0
+
+    n = len(log_r)
+    lo_l = np.floor(n * logratio_trim) + 1
+    hi_l = n + 1 - lo_l
+    lo_s = np.floor(n * sum_trim) + 1
+    hi_s = n + 1 - lo_s
+
+    rank_r = rankdata(log_r)
+    rank_e = rankdata(abs_e)
+    keep = (rank_r >= lo_l) & (rank_r <= hi_l) & (rank_e >= lo_s) & (rank_e <= hi_s)
+    f = np.nansum(log_r[keep] / v[keep]) / np.nansum(1 / v[keep])
+    if np.isnan(f):
+        f = 0
+    return 2**f
+
+
+def tmm_factors(
+    counts: np.ndarray, indices: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """edgeR TMM normalization factors.
+
+    The factor of a sample relative to a reference sample does not depend on the resample, so each (sample,
+    reference) pair is computed once and reused by all resamples. Per resample, only the reference column and the
+    final scaling to a geometric mean of one are determined.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        Raw counts, genes x samples.
+    indices : numpy.ndarray, optional
+        Column indices of resamples, shape (resamples, columns) or (columns,).
+    weights : numpy.ndarray, optional
+        Column weights of resamples, shape (resamples, samples) or (samples,).
+
+    Returns
+    -------
+    numpy.ndarray
+        Normalization factors with the shape of indices or weights; 1D over all samples if neither is given.
+    """
+    counts = np.asarray(counts, dtype=float)
+    w = _as_weights(counts.shape[1], indices, weights)
+    lib_size = counts.sum(axis=0)
+    expressed = counts > 0
+    scaled = counts / lib_size
+    pairs: dict[tuple[int, int], float] = {}
+
+    factors = np.full(w.shape, np.nan)
+    for b, wb in enumerate(w):
+        drawn = np.flatnonzero(wb > 0)
+
+        # Upper quartiles after removing genes with zero counts in every drawn sample, as in calcNormFactors
+        rows = expressed[:, drawn].any(axis=1)
+        f75 = np.quantile(scaled[rows][:, drawn], 0.75, axis=0)
+        multiplicity = wb[drawn]
+        weighted_mean = np.sum(multiplicity * f75) / multiplicity.sum()
+        if np.allclose(multiplicity, np.round(multiplicity)):
+            f75 = np.repeat(f75, np.round(multiplicity).astype(int))
+            drawn_columns = np.repeat(drawn, np.round(multiplicity).astype(int))
+        else:
+            drawn_columns = drawn
+        if np.median(f75) < 1e-20:
+            ref = drawn_columns[np.argmax(np.sqrt(counts[:, drawn_columns]).sum(axis=0))]
+        else:
+            ref = drawn_columns[np.argmin(np.abs(f75 - weighted_mean))]
+
+        for i in drawn:
+            pair = (int(i), int(ref))
+            if pair not in pairs:
+                pairs[pair] = _tmm_pair(counts[:, i], counts[:, ref], lib_size[i], lib_size[ref])
+            factors[b, i] = pairs[pair]
+
+        # Scale to a geometric mean of one over the (weighted) columns of the resample
+        log_f = np.log(factors[b, drawn])
+        factors[b, drawn] /= np.exp(np.sum(multiplicity * log_f) / multiplicity.sum())
+
+    return _gather(factors, indices, weights)
@@ -6,10 +6,14 @@ import seaborn as sns
 from scipy.optimize import curve_fit
 
 
-sns.set_style("whitegrid", {"axes.linewidth": 2, "axes.edgecolor": "black"})
+def set_style() -> None:
+    """Apply the global seaborn style; called by the plotting functions rather than on import"""
+    sns.set_style("whitegrid", {"axes.linewidth": 2, "axes.edgecolor": "black"})
+    sns.set_palette("tab10")
 
 
 def make_volcano(tab: pd.DataFrame, lfc: float = 0, fdr: float = 0.05, title: str = "", ylim: float = np.inf):
+    set_style()
     sig = tab[(tab["FDR"] < fdr) & (tab["logFC"].abs() > lfc)]
     sns.scatterplot(x=tab["logFC"], y=-np.log10(tab["FDR"]), edgecolor=None, color="grey")
     sns.scatterplot(x=sig["logFC"], y=-np.log10(sig["FDR"]), edgecolor=None)
@@ -34,6 +38,8 @@ pretty_met = {
     "kurt": "Kurtosis",
     "Spear": "Spearman correlation",
     "KL": "KL Divergence",
+    "Kendall": "Kendall's tau",
+    "TopK": "Top-k overlap",
     "Rep": "Replicability",
     "Prec": "Precision",
     "Rec": "Recall",
@@ -62,7 +68,6 @@ boxprops = {"boxstyle": "round", "facecolor": "#e4eaf3", "alpha": 1, "edgecolor"
 
 palette = sns.color_palette("crest", n_colors=len(order_rep))
 palette_ordered = dict(zip(order_rep, palette[: len(order_rep)], strict=False))
-sns.set_palette("tab10")
 
 cohorts = range(50)
 reference = "Cohort"
@@ -94,6 +99,7 @@ def compare_plot(
     n2=10,
     observed_spearman=None,
 ):
+    set_style()
     all_n = {n1: (x1, y1_suffix), n2: (x2, y2_suffix)}
 
     dfm = pd.read_csv("../resources/degen_medo_results.csv", index_col=0)
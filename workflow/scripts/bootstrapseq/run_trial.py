@@ -0,0 +1,326 @@
+import os
+import sys
+from pathlib import Path
+from typing import Any
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from . import trial_cache
+from .DEA import dea_versions
+from .DEA import run_dea
+from .normalization import size_factors
+from .normalization import tmm_factors
+
+
+def bootstrap_resample(df: pd.DataFrame, design: str | pd.DataFrame) -> pd.DataFrame:
+    n = len(df.columns) // 2
+
+    if isinstance(design, pd.DataFrame):
+        if "Condition" not in design.columns:
+            raise Exception("Custom desgin matrix must have column 'Condition'")
+        dd = design.value_counts("Condition").loc[list(set(design["Condition"]))]
+        if dd.shape != (2,):
+            raise Exception("Must have two conditions")
+        n_control = dd.iloc[0]
+        n_perturbed = dd.iloc[1]
+
+        bootstrap_samples_c = np.random.choice(df.columns[:n_control], n_control)
+        bootstrap_samples_p = np.random.choice(df.columns[n_perturbed:], n_perturbed)
+        bs = list(bootstrap_samples_c) + list(bootstrap_samples_p)
+        df_trial = df[bs]
+
+    elif design == "paired":
+        # preserve matched samples
+        ind = np.array(np.random.choice(range(0, n), n))
+        ind = np.concatenate([ind, ind + n])
+        ind = np.sort(ind)
+        df_trial = df.iloc[:, ind]
+
+    elif design == "unpaired":
+        bootstrap_samples_c = np.random.choice(df.columns[:n], n)
+        bootstrap_samples_p = np.random.choice(df.columns[n:], n)
+        bs = list(bootstrap_samples_c) + list(bootstrap_samples_p)
+        df_trial = df[bs]
+
+    return df_trial
+
+
+WEIGHT_BLOCK = 1024
+WEIGHTED_SCHEMES = ["multinomial", "bayesian"]
+
+
+def bootstrap_weights(
+    strata: np.ndarray, trials: int, scheme: str = "multinomial", seed: int = 0, start: int = 0, min_unique: int = 1
+) -> np.ndarray:
+    """Draw per-unit bootstrap weights for trials start + 1, ..., trials in vectorized draws.
+
+    Units are resampled within their stratum (condition). Trials are drawn in blocks of WEIGHT_BLOCK, and each
+    (stratum, block) has its own random stream, so the weights of a trial do not change when more trials are requested
+    later, and a single trial only costs the draw of its block. Draws with fewer than min_unique units of a stratum
+    in the resample are replaced by draws from additional streams of the same (stratum, block).
+
+    Parameters
+    ----------
+    strata : numpy.ndarray
+        Stratum label for each resampling unit (sample, or pair for paired designs).
+    trials : int
+        Number of the last bootstrap trial.
+    scheme : str, optional
+        "multinomial" for integer multiplicities as in the classic bootstrap, or "bayesian" for Dirichlet weights
+        scaled to the stratum size, by default "multinomial".
+    seed : int, optional
+        Seed shared by all trials, by default 0.
+    start : int, optional
+        Number of leading trials to skip, by default 0 (all trials).
+    min_unique : int, optional
+        Minimum number of units with non-zero weight per stratum, by default 1 (no constraint).
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (trials - start, units) with non-negative weights summing to the stratum size within each
+        stratum.
+    """
+    if scheme not in WEIGHTED_SCHEMES:
+        raise Exception(f"Bootstrap scheme {scheme} not implemented")
+
+    strata = np.asarray(strata)
+    first_block = start // WEIGHT_BLOCK
+    n_blocks = -(-trials // WEIGHT_BLOCK) - first_block
+    weights = np.zeros((n_blocks * WEIGHT_BLOCK, len(strata)))
+
+    def draw(rng: np.random.Generator, k: int, size: int) -> np.ndarray:
+        if scheme == "multinomial":
+            return rng.multinomial(k, np.full(k, 1 / k), size=size)
+        return k * rng.dirichlet(np.ones(k), size=size)
+
+    for i, stratum in enumerate(pd.unique(strata)):
+        members = np.flatnonzero(strata == stratum)
+        k = len(members)
+        if k < min_unique:
+            raise Exception(f"Condition {stratum} has {k} resampling units, the bootstrap needs at least {min_unique}")
+
+        for b in range(n_blocks):
+            block_weights = draw(np.random.default_rng([seed, i, first_block + b]), k, WEIGHT_BLOCK)
+            attempt = 0
+            while (degenerate := np.count_nonzero(block_weights, axis=1) < min_unique).any():
+                attempt += 1
+                retry = np.random.default_rng([seed, i, first_block + b, attempt])
+                block_weights[degenerate] = draw(retry, k, int(degenerate.sum()))
+            weights[b * WEIGHT_BLOCK : (b + 1) * WEIGHT_BLOCK, members] = block_weights
+
+    offset = first_block * WEIGHT_BLOCK
+    return weights[start - offset : trials - offset]
+
+
+def sample_weights(
+    df: pd.DataFrame,
+    design: str | pd.DataFrame,
+    trials: int,
+    scheme: str = "multinomial",
+    start: int = 0,
+    min_unique: int = 1,
+) -> np.ndarray:
+    """Bootstrap weights for each column of df, resampling within conditions and preserving matched samples.
+
+    min_unique is the minimum number of distinct units (samples, or pairs for paired designs) drawn per condition.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (trials - start, len(df.columns)) for trials start + 1, ..., trials.
+    """
+    n = len(df.columns) // 2
+
+    if isinstance(design, pd.DataFrame):
+        if "Condition" not in design.columns:
+            raise Exception("Custom desgin matrix must have column 'Condition'")
+        strata = design.loc[df.columns, "Condition"].to_numpy()
+        return bootstrap_weights(strata, trials, scheme, start=start, min_unique=min_unique)
+
+    elif design == "paired":
+        # One weight per pair, shared by both matched samples
+        weights = bootstrap_weights(np.zeros(n), trials, scheme, start=start, min_unique=min_unique)
+        return np.concatenate([weights, weights], axis=1)
+
+    elif design == "unpaired":
+        return bootstrap_weights(np.repeat([0, 1], n), trials, scheme, start=start, min_unique=min_unique)
+
+    raise Exception("Invalid desing:", design)
+
+
+def jackknife_units(df: pd.DataFrame, design: str | pd.DataFrame) -> int:
+    """Number of jackknife fits: one per pair for paired designs, else one per sample"""
+    return len(df.columns) // 2 if isinstance(design, str) and design == "paired" else len(df.columns)
+
+
+def jackknife_mask(df: pd.DataFrame, design: str | pd.DataFrame, left_out: int) -> np.ndarray:
+    """Boolean mask over df columns that leaves out one sample, or one matched pair for paired designs"""
+    if not 0 <= left_out < jackknife_units(df, design):
+        raise Exception(f"Jackknife has {jackknife_units(df, design)} units, cannot leave out unit {left_out}")
+
+    keep = np.ones(len(df.columns), dtype=bool)
+    keep[left_out] = False
+    if isinstance(design, str) and design == "paired":
+        keep[left_out + len(df.columns) // 2] = False
+    return keep
+
+
+def run_trial(
+    savepath: str,
+    name: str,
+    trial_number: int,
+    count_matrix_path: str,
+    design: str,
+    n_shards: int = 1,
+    bootstrap: str = "resample",
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: Optional[int] = None,
+    precompute_norm: bool = False,
+    method: str = "edger",
+) -> None:
+    lfc = 0
+
+    if method.lower() == "deseq2" and bootstrap in WEIGHTED_SCHEMES:
+        # DESeq2 rescales observation weights per gene and drops samples with small relative weights, so they do not
+        # act as bootstrap frequency weights
+        raise Exception(f"Bootstrap scheme {bootstrap} requires edgeR; use 'resample' or 'jackknife' with DESeq2")
+
+    if method.lower() != "deseq2" and n_shards > 1:
+        # glmQLFit shares information across genes, so gene shards would change the edgeR results
+        raise Exception("Gene sharding is only supported for DESeq2; run edgeR trials with n_shards=1")
+
+    if trial_number == 0:
+        outfile = Path(f"{savepath}/{name}_original.csv")
+    else:
+        outfile = Path(f"{savepath}/{name}_trial_{trial_number}.csv")
+
+    # Trials are cached by content, so reruns under another name or savepath reuse them
+    key = None
+    if cache_dir is not None:
+        key = trial_cache.trial_key(
+            count_matrix_path,
+            design,
+            method,
+            lfc,
+            trial_number,
+            bootstrap,
+            "numpy" if precompute_norm else "R",
+            n_shards,
+            dea_versions(method),
+        )
+        if trial_cache.get(cache_dir, key, outfile):
+            return
+
+    np.random.seed(trial_number)
+
+    df = pd.read_csv(count_matrix_path, index_col=0)
+
+    weights = None
+    dea_kwargs: dict[str, Any] = {}
+    dea_design: str | pd.DataFrame = design
+    if trial_number == 0:  # Original, unbootstrapped df
+        df_trial = df
+    elif bootstrap in [*WEIGHTED_SCHEMES, "jackknife"]:
+        # Fit a subset of columns without duplicates: the unique samples drawn by a weighted bootstrap, weighted by
+        # their multiplicity, or all samples but the left-out unit of a jackknife
+        meta = pd.read_csv(design, index_col=0) if os.path.isfile(design) else None
+        if meta is None and design not in ["paired", "unpaired"]:
+            raise Exception("Invalid desing:", design)
+        if meta is None and len(df.columns) % 2 != 0:
+            raise Exception("Must have balanced number of replicates per condition for paired or unpaired designs")
+
+        if bootstrap == "jackknife":
+            drawn = jackknife_mask(df, design if meta is None else meta, trial_number - 1)
+        else:
+            # Unlike duplicated columns, the unique samples of a resample must leave residual df for the GLM fit,
+            # so resamples drawing a single sample (or pair) of a condition are redrawn
+            weights = sample_weights(
+                df, design if meta is None else meta, trial_number, bootstrap, start=trial_number - 1, min_unique=2
+            )[0]
+            drawn = weights > 0
+            weights = weights[drawn]
+        df_trial = df.loc[:, drawn]
+
+        if meta is not None:
+            dea_design = meta.loc[df_trial.columns]
+        elif design == "unpaired":
+            # Conditions may have lost different numbers of samples
+            n = len(df.columns) // 2
+            dea_kwargs = {"N_control": int(drawn[:n].sum()), "N_treat": int(drawn[n:].sum())}
+            dea_design = "unpaired_asymmetric"
+    else:
+        if design in ["paired", "unpaired"]:
+            if len(df.columns) % 2 != 0:
+                raise Exception("Must have balanced number of replicates per condition for paired or unpaired designs")
+            df_trial = bootstrap_resample(df, design)
+
+        elif os.path.isfile(design):
+            meta = pd.read_csv(design, index_col=0)
+            df_trial = bootstrap_resample(df, meta)
+            # Passed to R as a data frame, rows renamed like the resampled columns below
+            meta_trial = meta.loc[df_trial.columns]
+            meta_trial.index = pd.Index([col + str(i) for i, col in enumerate(meta_trial.index)])
+            dea_design = meta_trial
+
+        else:
+            raise Exception("Invalid desing:", design)
+
+        # Ensure no duplicate col names
+        df_trial.columns = [col + str(i) for i, col in enumerate(df_trial.columns)]
+
+    if precompute_norm:
+        # Factors in NumPy instead of calcNormFactors/estimateSizeFactors; weighted resamples get
+        # duplication-equivalent factors
+        if method.lower() == "deseq2":
+            dea_kwargs["size_factors"] = size_factors(df_trial.to_numpy(), weights=weights)
+        else:
+            dea_kwargs["norm_factors"] = tmm_factors(df_trial.to_numpy(), weights=weights)
+
+    # The table is completed in a temporary file and moved into place, so an existing outfile is always a finished
+    # trial, even if the process is killed midway (work queue workers rely on this)
+    tmpfile = outfile.with_name(f".{outfile.stem}.{os.getpid()}.tmp.csv")
+    run_dea(
+        df_trial,
+        str(tmpfile),
+        method,
+        True,
+        verbose=False,
+        lfc=lfc,
+        design=dea_design,
+        n_shards=n_shards,
+        sample_weights=weights,
+        **dea_kwargs,
+    )
+
+    if trial_number > 0:
+        tab = pd.read_csv(tmpfile, index_col=0)
+        tab["Trial"] = trial_number
+        tab.to_csv(tmpfile)
+    os.replace(tmpfile, outfile)
+
+    if cache_dir is not None and key is not None:
+        trial_cache.put(cache_dir, key, outfile, cache_max_bytes)
+
+
+if __name__ == "__main__":
+    savepath = sys.argv[1]
+    name = sys.argv[2]
+    trial_number = int(sys.argv[3])
+    count_matrix_path = sys.argv[4]
+    design = sys.argv[5]
+    n_shards = int(sys.argv[6]) if len(sys.argv) > 6 else 1
+    bootstrap = sys.argv[7] if len(sys.argv) > 7 else "resample"
+    method = sys.argv[8] if len(sys.argv) > 8 else "edger"
+
+    CREATE_DUMMY_DATA = False
+
+    if CREATE_DUMMY_DATA:
+        df = pd.DataFrame(np.random.normal(0, 1, (10, 2)), index=range(10), columns=["logFC", "FDR"])
+        df["Trial"] = trial_number
+        df.to_csv(f"{savepath}/{name}_trial_{trial_number}.csv")
+
+    else:
+        run_trial(savepath, name, trial_number, count_matrix_path, design, n_shards, bootstrap, method=method)
@@ -0,0 +1,148 @@
+"""Content-addressed cache of trial result tables, shared across runs, names and save paths.
+
+A trial is identified by a hash of everything that determines its result: the contents of the count matrix and
+design, the DEA method and its R package version, the lfc threshold, the number of gene shards, the bootstrap scheme,
+the trial number (which seeds the resample) and the code that draws and fits the trial.
+Entries are stored as <cache_dir>/<key[:2]>/<key>.csv. Hits refresh the file's mtime, and eviction removes the least
+recently used entries until the cache fits its size bound.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+from functools import lru_cache
+from importlib.resources import files
+from pathlib import Path
+from typing import Optional
+
+
+@lru_cache(maxsize=16)
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    # size and mtime_ns are part of the memo key, so a modified file is hashed again
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digest(path: str | Path) -> str:
+    """sha256 of a file's contents, memoized per process for unchanged files"""
+    stat = os.stat(path)
+    return _file_digest(str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+
+
+# Package files that draw and fit a trial; changing any of them invalidates all cached trials
+CODE_FILES = ["R_functions.r", "R_wrappers.py", "DEA.py", "normalization.py", "run_trial.py"]
+
+
+@lru_cache(maxsize=None)
+def code_digest() -> str:
+    """sha256 of the package code listed in CODE_FILES"""
+    digest = hashlib.sha256()
+    package = files(__package__)
+    for name in CODE_FILES:
+        digest.update(name.encode())
+        digest.update(package.joinpath(name).read_bytes())
+    return digest.hexdigest()
+
+
+def trial_key(
+    count_matrix_path: str,
+    design: str,
+    method: str,
+    lfc: float,
+    trial_number: int,
+    bootstrap: str = "resample",
+    normalization: str = "R",
+    n_shards: int = 1,
+    versions: str = "",
+) -> str:
+    """Cache key of a trial. Designs given as a file are hashed by content, "paired"/"unpaired" by name.
+
+    versions identifies the software fitting the trial, e.g. "R 4.3.3; edgeR 4.0.16", see DEA.dea_versions().
+    """
+    design_id = f"file:{file_digest(design)}" if os.path.isfile(design) else f"name:{design}"
+    parts = [
+        f"counts:{file_digest(count_matrix_path)}",
+        design_id,
+        f"method:{method.lower()}",
+        f"lfc:{float(lfc)}",
+        f"bootstrap:{bootstrap if trial_number > 0 else 'none'}",
+        f"trial:{trial_number}",
+        f"normalization:{normalization}",
+        f"shards:{n_shards}",
+        f"versions:{versions}",
+        f"code:{code_digest()}",
+    ]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def entry_path(cache_dir: str | Path, key: str) -> Path:
+    return Path(cache_dir) / key[:2] / f"{key}.csv"
+
+
+def get(cache_dir: str | Path, key: str, outfile: str | Path) -> bool:
+    """Copy a cached trial to outfile. Returns False on a cache miss."""
+    entry = entry_path(cache_dir, key)
+    outfile = Path(outfile)
+    tmp = outfile.with_name(f".{outfile.name}.{os.getpid()}.tmp")
+    try:
+        shutil.copyfile(entry, tmp)
+        os.utime(entry)  # mark as recently used
+    except FileNotFoundError:
+        tmp.unlink(missing_ok=True)
+        return False
+    os.replace(tmp, outfile)  # atomic, so outfile is never a partial copy
+    logging.info(f"Cache hit: {key}")
+    return True
+
+
+def put(cache_dir: str | Path, key: str, infile: str | Path, max_bytes: Optional[int] = None) -> None:
+    """Store a trial table in the cache, then evict least recently used entries beyond max_bytes"""
+    entry = entry_path(cache_dir, key)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = entry.with_suffix(f".tmp.{os.getpid()}")
+    shutil.copyfile(infile, tmp)
+    os.replace(tmp, entry)  # atomic, so concurrent readers never see a partial entry
+
+    if max_bytes is not None:
+        evict(cache_dir, max_bytes)
+
+
+def entries(cache_dir: str | Path) -> list[tuple[Path, os.stat_result]]:
+    """Stat results of all cache entries, least recently used first"""
+    found = []
+    for entry in Path(cache_dir).glob("??/*.csv"):
+        try:
+            found.append((entry, entry.stat()))
+        except FileNotFoundError:
+            continue  # evicted concurrently
+    return sorted(found, key=lambda e: e[1].st_mtime)
+
+
+def evict(cache_dir: str | Path, max_bytes: int) -> int:
+    """Remove least recently used entries until the cache is at most max_bytes. Returns number of removed entries."""
+    cached = entries(cache_dir)
+    total = sum(stat.st_size for _, stat in cached)
+    removed = 0
+    for entry, stat in cached:
+        if total <= max_bytes:
+            break
+        entry.unlink(missing_ok=True)
+        total -= stat.st_size
+        removed += 1
+    if removed:
+        logging.info(f"Evicted {removed} cache entries")
+    return removed
+
+
+def cache_info(cache_dir: str | Path) -> dict:
+    cached = entries(cache_dir)
+    return {
+        "entries": len(cached),
+        "bytes": sum(stat.st_size for _, stat in cached),
+        "oldest": cached[0][1].st_mtime if cached else None,
+        "newest": cached[-1][1].st_mtime if cached else None,
+    }
@@ -0,0 +1,231 @@
+"""Pull-based trial queue on a shared filesystem.
+
+Trials are grouped into blocks, and each block is a file that moves between three directories:
+
+    pending/<block>                         waiting to be claimed
+    claimed/<block>@<worker>@<deadline>     leased to a worker until the deadline (unix time)
+    done/<block>                            all trials of the block are written
+
+Every state change is a single os.rename, which is atomic on POSIX filesystems: when several workers race for the
+same file, exactly one rename succeeds and the others get FileNotFoundError. The lease deadline is part of the file
+name, so renewing or stealing an expired lease is also a single rename. Leases should be much longer than the
+clock skew between hosts and than the runtime of a single trial.
+"""
+
+import logging
+import os
+import shutil
+import socket
+import time
+from pathlib import Path
+from typing import Callable
+from typing import Optional
+
+
+STATES = ["pending", "claimed", "done"]
+
+
+def block_name(first: int, last: int) -> str:
+    return f"{first:06d}-{last:06d}"
+
+
+def block_trials(block: str) -> range:
+    first, last = block.split("@")[0].split("-")
+    return range(int(first), int(last) + 1)
+
+
+def known_blocks(queue_dir: str | Path) -> set[str]:
+    """Names of all blocks in the queue, regardless of state"""
+    blocks: set[str] = set()
+    for state in STATES:
+        state_dir = Path(queue_dir) / state
+        if state_dir.is_dir():
+            blocks.update(f.split("@")[0] for f in os.listdir(state_dir))
+    return blocks
+
+
+def create_marker(path: Path) -> bool:
+    """Create an empty file if it does not exist. Returns True for exactly one of several concurrent callers."""
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def init_queue(
+    queue_dir: str | Path, trials: int, block_size: int = 1, first_trial: int = 0, wait_seconds: float = 60
+) -> int:
+    """Create the queue for trials first_trial..trials, or extend an existing queue with new blocks.
+
+    Every worker may call this with the same arguments. Creation and each extension are guarded by marker files
+    created with O_EXCL, so exactly one caller populates the queue and exactly one caller extends it to a given
+    number of trials; the others wait until the queue exists and return 0. The initial population is built in a
+    private directory and moved into place with one rename, so workers never see a partial queue. Extensions to
+    different numbers of trials should not run concurrently.
+
+    Returns
+    -------
+    int
+        Number of blocks added.
+    """
+    queue_dir = Path(queue_dir)
+    queue_dir.mkdir(parents=True, exist_ok=True)
+    for state in ["claimed", "done"]:
+        (queue_dir / state).mkdir(exist_ok=True)
+
+    def make_blocks(first_trial: int) -> list[str]:
+        return [
+            block_name(first, min(first + block_size - 1, trials))
+            for first in range(first_trial, trials + 1, block_size)
+        ]
+
+    # Queues created before the marker was introduced already have a pending directory
+    if not (queue_dir / "pending").exists() and create_marker(queue_dir / ".initialized"):
+        blocks = make_blocks(first_trial)
+        staging = queue_dir / f".init.{socket.gethostname()}.{os.getpid()}"
+        (staging / "pending").mkdir(parents=True)
+        for block in blocks:
+            (staging / "pending" / block).touch()
+        os.rename(staging / "pending", queue_dir / "pending")
+        shutil.rmtree(staging, ignore_errors=True)
+        create_marker(queue_dir / f".extended.{trials}")
+        logging.info(f"Initialized queue with {len(blocks)} blocks: {queue_dir}")
+        return len(blocks)
+
+    deadline = time.time() + wait_seconds
+    while not (queue_dir / "pending").exists():
+        if time.time() > deadline:
+            raise Exception(f"Queue is being initialized by another process but has no pending blocks: {queue_dir}")
+        time.sleep(0.1)
+
+    # Extend: new blocks start after the last trial already in the queue
+    last_known = max((block_trials(block)[-1] for block in known_blocks(queue_dir)), default=first_trial - 1)
+    if last_known >= trials or not create_marker(queue_dir / f".extended.{trials}"):
+        return 0
+    new_blocks = make_blocks(last_known + 1)
+    for block in new_blocks:
+        (queue_dir / "pending" / block).touch()
+    if new_blocks:
+        logging.info(f"Added {len(new_blocks)} blocks to queue: {queue_dir}")
+    return len(new_blocks)
+
+
+def claim_block(queue_dir: str | Path, worker_id: str, lease_seconds: float) -> Optional[Path]:
+    """Claim a pending block, or steal a block whose lease has expired.
+
+    Returns
+    -------
+    pathlib.Path or None
+        Path of the claimed block file, or None if there is nothing left to claim.
+    """
+    queue_dir = Path(queue_dir)
+    deadline = int(time.time() + lease_seconds)
+
+    for block in sorted(os.listdir(queue_dir / "pending")):
+        claimed = queue_dir / "claimed" / f"{block}@{worker_id}@{deadline}"
+        try:
+            os.rename(queue_dir / "pending" / block, claimed)
+            return claimed
+        except FileNotFoundError:
+            continue  # claimed by another worker in the meantime
+
+    now = time.time()
+    for lease in sorted(os.listdir(queue_dir / "claimed")):
+        block, _, expires = lease.split("@")
+        if int(expires) > now:
+            continue
+        claimed = queue_dir / "claimed" / f"{block}@{worker_id}@{deadline}"
+        try:
+            os.rename(queue_dir / "claimed" / lease, claimed)
+            logging.warning(f"Lease expired, reclaiming block {block} from {lease}")
+            return claimed
+        except FileNotFoundError:
+            continue
+
+    return None
+
+
+def renew_lease(claimed: Path, lease_seconds: float) -> Path:
+    """Extend the lease of a claimed block. Raises FileNotFoundError if the lease was lost to another worker."""
+    block, worker_id, _ = claimed.name.split("@")
+    renewed = claimed.with_name(f"{block}@{worker_id}@{int(time.time() + lease_seconds)}")
+    os.rename(claimed, renewed)
+    return renewed
+
+
+def complete_block(queue_dir: str | Path, claimed: Path) -> None:
+    os.rename(claimed, Path(queue_dir) / "done" / claimed.name.split("@")[0])
+
+
+def completed_trials(queue_dir: str | Path) -> list[int]:
+    """Trial numbers of all blocks marked as done"""
+    done_dir = Path(queue_dir) / "done"
+    if not done_dir.is_dir():
+        return []
+    return sorted(trial for block in os.listdir(done_dir) for trial in block_trials(block))
+
+
+def queue_status(queue_dir: str | Path) -> dict:
+    """Number of blocks per state, and number of claimed blocks whose lease has expired"""
+    queue_dir = Path(queue_dir)
+    leases = {state: os.listdir(queue_dir / state) if (queue_dir / state).is_dir() else [] for state in STATES}
+    status = {state: len(files) for state, files in leases.items()}
+    now = time.time()
+    status["expired"] = sum(int(lease.split("@")[2]) <= now for lease in leases["claimed"])
+    return status
+
+
+def run_worker(
+    queue_dir: str | Path,
+    run: Callable[[int], None],
+    is_complete: Callable[[int], bool] = lambda trial: False,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = 3600,
+    max_blocks: Optional[int] = None,
+) -> int:
+    """Claim blocks and run their trials until the queue is drained.
+
+    Parameters
+    ----------
+    queue_dir : str
+        Queue directory created by init_queue().
+    run : Callable
+        Runs a single trial given its number.
+    is_complete : Callable, optional
+        Returns True for trials whose output already exists, which are skipped.
+    worker_id : str, optional
+        Unique worker name, by default <hostname>.<pid>.
+    lease_seconds : float, optional
+        Lease duration, renewed after each trial, by default 3600.
+    max_blocks : int, optional
+        Exit after this many blocks, by default run until no block can be claimed.
+
+    Returns
+    -------
+    int
+        Number of blocks completed by this worker.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}.{os.getpid()}"
+    completed = 0
+
+    while max_blocks is None or completed < max_blocks:
+        claimed = claim_block(queue_dir, worker_id, lease_seconds)
+        if claimed is None:
+            break
+
+        for trial in block_trials(claimed.name):
+            if not is_complete(trial):
+                logging.info(f"Worker {worker_id} running trial {trial}")
+                run(trial)
+            try:
+                claimed = renew_lease(claimed, lease_seconds)
+            except FileNotFoundError:
+                logging.warning(f"Worker {worker_id} lost the lease on {claimed.name}, moving on")
+                break
+        else:
+            complete_block(queue_dir, claimed)
+            completed += 1
+
+    logging.info(f"Worker {worker_id} exiting after {completed} blocks")
+    return completed
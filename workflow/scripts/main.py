@@ -1,4 +1,12 @@
-print("Hello World")
+"""Run the bootstrapseq command line interface from a checkout, without installing the package.
+
+The Snakefile calls this script; the directory of the script is on sys.path, so the package next to it is imported.
+"""
+
+import sys
+
+from bootstrapseq.main import main
+
 
 if __name__ == "__main__":
-    print("We are rolling!")
+    main(sys.argv[1:])